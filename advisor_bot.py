@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler, ContextTypes
@@ -69,7 +70,9 @@ class ScholarshipBot:
                 reply_markup=self.create_main_menu()
             )
             
-            response = self.query_processor.process_query(update.message.text)
+            # Запрос обрабатывается в отдельном потоке, чтобы одновременные сообщения
+            # попадали в один микробатч эмбеддингов, а не ждали друг друга
+            response = await asyncio.to_thread(self.query_processor.process_query, update.message.text)
             
             if hasattr(response, 'answer'):
                 answer = response.answer
@@ -127,7 +130,7 @@ class ScholarshipBot:
         await query.message.edit_text(text, reply_markup=self.create_main_menu())
 
     def run(self):
-        application = Application.builder().token(self.token).build()
+        application = Application.builder().token(self.token).concurrent_updates(True).build()
 
         application.add_handler(CommandHandler("start", self.start_command))
         application.add_handler(CommandHandler("help", self.help_command))
@@ -0,0 +1,424 @@
+import argparse
+import logging
+import re
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings
+
+from smart_advisor.config.config import config
+from smart_advisor.core.backends import BACKENDS, encode_length_sorted, load_embedding_model
+from smart_advisor.core.chunking import preprocess_text, split_into_chunks, token_counts
+from smart_advisor.core.database import VectorDatabase, hnsw_metadata, read_alias
+from smart_advisor.core.embeddings import EmbeddingService
+from smart_advisor.core.model_registry import get_tokenizer
+from smart_advisor.core.reranker import Reranker
+from smart_advisor.core.embedding_workers import EmbeddingWorkerPool
+from smart_advisor.core.numpy_index import NumpyCollection
+from smart_advisor.core.vector_store import CODE_TYPES, CompactVectorStore, normalize_rows
+from smart_advisor.parsers.registry import get_registry
+from smart_advisor.services.file_loader import FileLoader
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+SAMPLE_QUERIES = [
+    "что такое стипендия",
+    "сколько составляет стипендия",
+    "сколько составляет академическая стипендия",
+    "какие требования для получения повышенной стипендии",
+    "когда выплачивается стипендия",
+    "как оформить социальную стипендию",
+    "какие документы нужны для социальной стипендии",
+    "кто может получить именную стипендию",
+]
+
+
+def open_chroma_collection():
+    client = chromadb.Client(Settings(
+        persist_directory=str(config.DB_PATH),
+        is_persistent=True
+    ))
+    return client.get_collection(read_alias(config.DB_PATH))
+
+
+def load_corpus_texts(limit: int = None) -> List[str]:
+    return open_chroma_collection().get(include=['documents'], limit=limit)['documents']
+
+
+def load_corpus_embeddings(limit: int = None) -> np.ndarray:
+    return np.asarray(open_chroma_collection().get(include=['embeddings'], limit=limit)['embeddings'], dtype=np.float32)
+
+
+def recall_at_k(expected: np.ndarray, found: np.ndarray) -> float:
+    return len(set(expected.tolist()) & set(found.tolist())) / len(expected)
+
+
+def percentile_ms(latencies: List[float], q: float) -> float:
+    return float(np.percentile(latencies, q) * 1000)
+
+
+def backend_parity(texts: List[str], queries: List[str], candidate: str, batch_size: int) -> Dict[str, float]:
+    # Сравнение бэкенда с fp32-моделью: косинус между векторами и задержка на запрос и на батч
+    model_name = config.EMBEDDING_CONFIG['model_name']
+    reference_model = load_embedding_model(model_name, 'torch')
+    candidate_model = load_embedding_model(model_name, candidate)
+
+    report = {}
+    for name, model in (('torch', reference_model), (candidate, candidate_model)):
+        model.encode(queries[:2], convert_to_numpy=True)
+
+        query_latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            model.encode(query, convert_to_numpy=True)
+            query_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+        batch_time = time.perf_counter() - start
+
+        report[f'{name}_query_p50_ms'] = percentile_ms(query_latencies, 50)
+        report[f'{name}_query_p99_ms'] = percentile_ms(query_latencies, 99)
+        report[f'{name}_batch_texts_per_sec'] = len(texts) / batch_time
+        report[f'{name}_embeddings'] = embeddings
+
+    cosine = np.sum(report.pop('torch_embeddings') * report.pop(f'{candidate}_embeddings'), axis=1)
+    report['cosine_mean'] = float(cosine.mean())
+    report['cosine_min'] = float(cosine.min())
+    report['query_speedup'] = report['torch_query_p50_ms'] / report[f'{candidate}_query_p50_ms']
+    report['batch_speedup'] = report[f'{candidate}_batch_texts_per_sec'] / report['torch_batch_texts_per_sec']
+    return report
+
+
+def run_backends(args) -> None:
+    texts = load_corpus_texts(args.limit)
+    print(f"\n=== Сравнение бэкендов эмбеддингов ({len(texts)} текстов, {len(SAMPLE_QUERIES)} запросов) ===")
+
+    for backend in args.backends:
+        report = backend_parity(texts, SAMPLE_QUERIES, backend, args.batch_size)
+        print(f"\n--- torch (fp32) vs {backend} ---")
+        print(f"Косинус с fp32: среднее {report['cosine_mean']:.4f}, минимум {report['cosine_min']:.4f}")
+        print(f"Запрос p50: {report['torch_query_p50_ms']:.1f} мс -> {report[f'{backend}_query_p50_ms']:.1f} мс "
+              f"(x{report['query_speedup']:.2f})")
+        print(f"Запрос p99: {report['torch_query_p99_ms']:.1f} мс -> {report[f'{backend}_query_p99_ms']:.1f} мс")
+        print(f"Батч: {report['torch_batch_texts_per_sec']:.1f} -> {report[f'{backend}_batch_texts_per_sec']:.1f} "
+              f"текстов/сек (x{report['batch_speedup']:.2f})")
+
+
+def run_workers(args) -> None:
+    texts = load_corpus_texts(args.limit)
+    print(f"\n=== Масштабирование пула эмбеддингов ({len(texts)} текстов) ===")
+
+    model = load_embedding_model(config.EMBEDDING_CONFIG['model_name'])
+    encode_length_sorted(model, texts[:args.batch_size], args.batch_size)
+    start = time.perf_counter()
+    encode_length_sorted(model, texts, args.batch_size)
+    baseline = len(texts) / (time.perf_counter() - start)
+    print(f"Без пула: {baseline:.1f} текстов/сек")
+    del model
+
+    for workers in args.workers:
+        with EmbeddingWorkerPool(workers, args.threads_per_worker, args.shard_size) as pool:
+            pool.warmup()
+            start = time.perf_counter()
+            for _ in pool.encode(texts, args.batch_size):
+                pass
+            rate = len(texts) / (time.perf_counter() - start)
+        print(f"{workers} процессов x {pool.threads_per_worker} потоков: {rate:.1f} текстов/сек "
+              f"(x{rate / baseline:.2f} к одному процессу)")
+
+
+def run_compact(args) -> None:
+    embeddings = load_corpus_embeddings(args.limit)
+    if args.replicate > 1:
+        # Имитация большого корпуса: копии векторов с небольшим шумом
+        rng = np.random.default_rng(0)
+        noise = rng.normal(scale=0.05, size=(len(embeddings) * (args.replicate - 1), embeddings.shape[1]))
+        embeddings = np.vstack([embeddings, np.tile(embeddings, (args.replicate - 1, 1)) + noise.astype(np.float32)])
+
+    model = load_embedding_model(config.EMBEDDING_CONFIG['model_name'])
+    queries = normalize_rows(model.encode(SAMPLE_QUERIES, convert_to_numpy=True))
+    vectors = normalize_rows(embeddings)
+    exact = [np.argsort(-(vectors @ query))[:args.k] for query in queries]
+
+    print(f"\n=== Компактное хранилище векторов ({len(vectors)} x {vectors.shape[1]}, k={args.k}) ===")
+    print(f"float32: {vectors.shape[1] * 4} байт/вектор в памяти")
+
+    for code_type in args.code_types:
+        with tempfile.TemporaryDirectory() as directory:
+            store = CompactVectorStore(directory, code_type, args.rerank_factor).build(embeddings)
+            latencies, recalls = [], []
+            for query, expected in zip(queries, exact):
+                start = time.perf_counter()
+                found, _ = store.search(query, args.k)
+                latencies.append(time.perf_counter() - start)
+                recalls.append(recall_at_k(expected, found))
+            print(f"{code_type}: {store.memory_per_vector():.0f} байт/вектор, "
+                  f"recall@{args.k} {np.mean(recalls):.3f}, p50 {percentile_ms(latencies, 50):.2f} мс")
+            del store
+
+
+def time_queries(collection, queries: np.ndarray, k: int, repeats: int) -> tuple:
+    latencies, ids = [], []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=k)
+            latencies.append(time.perf_counter() - start)
+    for query in queries:
+        ids.append(collection.query(query_embeddings=[query.tolist()], n_results=k)['ids'][0])
+    return latencies, ids
+
+
+def run_search(args) -> None:
+    chroma_collection = open_chroma_collection()
+    data = chroma_collection.get(include=['embeddings', 'documents', 'metadatas'])
+
+    model = load_embedding_model(config.EMBEDDING_CONFIG['model_name'])
+    queries = model.encode(SAMPLE_QUERIES, convert_to_numpy=True)
+
+    print(f"\n=== Chroma vs NumPy ({len(data['ids'])} векторов, k={args.k}) ===")
+    chroma_latencies, chroma_ids = time_queries(chroma_collection, queries, args.k, args.repeats)
+    print(f"chroma: p50 {percentile_ms(chroma_latencies, 50):.2f} мс, p99 {percentile_ms(chroma_latencies, 99):.2f} мс")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for mmap in (False, True):
+            collection = NumpyCollection(directory + f"/mmap_{mmap}", None, mmap=mmap)
+            collection.add(ids=data['ids'], embeddings=data['embeddings'],
+                           documents=data['documents'], metadatas=data['metadatas'])
+            latencies, ids = time_queries(collection, queries, args.k, args.repeats)
+            agreement = np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(chroma_ids, ids) if a])
+            print(f"numpy (mmap={mmap}): p50 {percentile_ms(latencies, 50):.2f} мс, "
+                  f"p99 {percentile_ms(latencies, 99):.2f} мс, совпадение top-{args.k} с chroma {agreement:.3f}")
+            del collection
+
+
+def run_hnsw(args) -> None:
+    embeddings = normalize_rows(load_corpus_embeddings(args.limit))
+    ids = [str(i) for i in range(len(embeddings))]
+
+    model = load_embedding_model(config.EMBEDDING_CONFIG['model_name'])
+    queries = normalize_rows(model.encode(SAMPLE_QUERIES, convert_to_numpy=True))
+    k = min(args.k, len(embeddings))
+    exact = [np.argsort(-(embeddings @ query))[:k] for query in queries]
+
+    print(f"\n=== HNSW: recall@{k} против точного поиска ({len(embeddings)} x {embeddings.shape[1]}, "
+          f"space={config.VECTOR_DB_CONFIG['distance_metric']}) ===")
+    print(f"{'M':>4} {'ef_constr':>10} {'ef_search':>10} {'сборка, с':>10} {'recall':>7} {'p50, мс':>8} {'p99, мс':>8}")
+
+    # Каждая комбинация собирается в отдельной коллекции в памяти: ef_search у Chroma задаётся при создании
+    client = chromadb.EphemeralClient()
+    batch_size = client.get_max_batch_size()
+    for m in args.m:
+        for construction_ef in args.construction_ef:
+            for search_ef in args.search_ef:
+                name = f"hnsw_bench_{m}_{construction_ef}_{search_ef}"
+                collection = client.create_collection(name=name, metadata=hnsw_metadata({
+                    "hnsw:M": m,
+                    "hnsw:construction_ef": construction_ef,
+                    "hnsw:search_ef": search_ef
+                }))
+
+                start = time.perf_counter()
+                for offset in range(0, len(ids), batch_size):
+                    collection.add(ids=ids[offset:offset + batch_size],
+                                   embeddings=embeddings[offset:offset + batch_size].tolist())
+                build_time = time.perf_counter() - start
+
+                latencies, found = time_queries(collection, queries, k, args.repeats)
+                recall = np.mean([recall_at_k(expected, np.asarray([int(id) for id in hits]))
+                                  for expected, hits in zip(exact, found)])
+                print(f"{m:>4} {construction_ef:>10} {search_ef:>10} {build_time:>10.2f} {recall:>7.3f} "
+                      f"{percentile_ms(latencies, 50):>8.2f} {percentile_ms(latencies, 99):>8.2f}")
+                client.delete_collection(name)
+
+
+def run_rerank(args) -> None:
+    vector_db = VectorDatabase(EmbeddingService())
+    reranker = Reranker(top_n=args.top_n, time_budget_ms=args.time_budget_ms)
+    candidates = vector_db.search_many(SAMPLE_QUERIES, k=args.k)
+    reranker.rerank(SAMPLE_QUERIES[0], candidates[0])  # загрузка модели не входит в замер
+    reranker = Reranker(top_n=args.top_n, time_budget_ms=args.time_budget_ms)
+
+    print(f"\n=== Переранжирование кросс-энкодером ({config.RERANK_CONFIG['model_name']}, "
+          f"k={args.k}, top_n={args.top_n}, бюджет {args.time_budget_ms} мс) ===")
+    for repeat in range(args.repeats):
+        for query, results in zip(SAMPLE_QUERIES, candidates):
+            reranked = reranker.rerank(query, results)
+            if repeat == 0 and results:
+                changed = "изменён" if reranked[0].document_id != results[0].document_id else "тот же"
+                print(f"{query}: top-1 {changed}")
+
+    stats = reranker.stats()
+    print(f"\ntop-1 изменён в {stats['top1_change_rate']:.0%} запросов, бюджет превышен {stats['budget_exceeded']} раз")
+    print(f"Добавленная задержка: p50 {stats['latency_p50_ms']:.1f} мс, p99 {stats['latency_p99_ms']:.1f} мс")
+
+
+def text_quality(pages: List[str]) -> Dict[str, float]:
+    # Грубые признаки качества извлечения: доля кириллицы среди букв, доля "битых" слов
+    # (смесь алфавитов, символ замены) и доля однобуквенных слов (текст вразрядку, разорванные слова)
+    text = "\n".join(pages)
+    letters = re.findall(r'[^\W\d_]', text)
+    words = re.findall(r'\w+', text)
+    broken = [w for w in words if '\ufffd' in w or (re.search(r'[а-яё]', w, re.I) and re.search(r'[a-z]', w, re.I))]
+    single = [w for w in words if len(w) == 1 and not w.isdigit()]
+    return {
+        'chars_per_page': len(text) / max(len(pages), 1),
+        'cyrillic': len(re.findall(r'[а-яё]', text, re.I)) / max(len(letters), 1),
+        'broken': len(broken) / max(len(words), 1),
+        'single': len(single) / max(len(words), 1),
+        'words': set(w.lower() for w in words)
+    }
+
+
+def run_parsers(args) -> None:
+    registry = get_registry()
+    pdf_files = sorted(config.PDF_DIR.glob("*.pdf"))[:args.limit]
+    parsers = [parser for parser in registry.parsers() if parser.name in args.parsers]
+
+    print(f"\n=== Парсеры PDF: {len(pdf_files)} файлов ({config.PDF_DIR}) ===")
+    print(f"{'парсер':>8} {'стр/с':>8} {'симв/стр':>9} {'кириллица':>10} {'битые':>7} {'1-букв':>7} {'сходство':>9}")
+
+    reference: Dict[str, set] = {}
+    for parser in parsers:
+        total_pages, total_time, metrics, similarity = 0, 0.0, [], []
+        for path in pdf_files:
+            start = time.perf_counter()
+            try:
+                pages, _ = parser.extract_pages(path)
+            except Exception as e:
+                logger.warning(f"{parser.name}: ошибка на {path.name}: {str(e)}")
+                continue
+            total_time += time.perf_counter() - start
+            total_pages += len(pages)
+            quality = text_quality(pages)
+            metrics.append(quality)
+            # Сходство словаря с первым парсером списка (Жаккар по множествам слов)
+            if path.name in reference:
+                union = reference[path.name] | quality['words']
+                similarity.append(len(reference[path.name] & quality['words']) / max(len(union), 1))
+            else:
+                reference[path.name] = quality['words']
+
+        if not metrics:
+            continue
+        mean = {key: np.mean([m[key] for m in metrics]) for key in ('chars_per_page', 'cyrillic', 'broken', 'single')}
+        print(f"{parser.name:>8} {total_pages / max(total_time, 1e-9):>8.1f} {mean['chars_per_page']:>9.0f} "
+              f"{mean['cyrillic']:>10.3f} {mean['broken']:>7.3f} {mean['single']:>7.3f} "
+              f"{np.mean(similarity) if similarity else 1.0:>9.3f}")
+
+
+def length_stats(lengths: List[int], limit: int, batch_size: int) -> Dict[str, float]:
+    # Доля паддинга при батчах из отсортированных по длине входов, как в encode_length_sorted
+    ordered = sorted((min(length, limit) for length in lengths), reverse=True)
+    padded = sum(max(ordered[i:i + batch_size]) * len(ordered[i:i + batch_size])
+                 for i in range(0, len(ordered), batch_size))
+    return {
+        'count': len(lengths),
+        'p10': float(np.percentile(lengths, 10)),
+        'p50': float(np.percentile(lengths, 50)),
+        'p90': float(np.percentile(lengths, 90)),
+        'max': max(lengths),
+        'truncated': sum(length > limit for length in lengths) / len(lengths),
+        'tiny': sum(length < config.CHUNK_CONFIG['min_tokens'] for length in lengths) / len(lengths),
+        'padding': 1 - sum(ordered) / max(padded, 1)
+    }
+
+
+def run_chunks(args) -> None:
+    tokenizer = get_tokenizer()
+    documents = FileLoader().load_documents()[:args.limit]
+    limit = config.CHUNK_CONFIG['max_tokens']
+    strategies = {
+        'абзацы': lambda text: [preprocess_text(p) for p in text.split('\n\n') if p.strip()],
+        'токены': lambda text: split_into_chunks(text, tokenizer, args.target_tokens, args.overlap_tokens)
+    }
+
+    print(f"\n=== Разбиение на фрагменты: {len(documents)} документов, предел модели {limit} токенов ===")
+    print(f"{'способ':>8} {'фрагм.':>7} {'p10':>6} {'p50':>6} {'p90':>6} {'max':>6} {'обрезано':>9} "
+          f"{'мелких':>7} {'паддинг':>8} {'сек':>6}")
+    for name, split in strategies.items():
+        start = time.perf_counter()
+        chunks = [chunk for doc in documents for chunk in split(doc.text)]
+        elapsed = time.perf_counter() - start
+        if not chunks:
+            continue
+        stats = length_stats(token_counts(tokenizer, chunks), limit, config.EMBEDDING_CONFIG['batch_size'])
+        print(f"{name:>8} {stats['count']:>7} {stats['p10']:>6.0f} {stats['p50']:>6.0f} {stats['p90']:>6.0f} "
+              f"{stats['max']:>6} {stats['truncated']:>9.3f} {stats['tiny']:>7.3f} {stats['padding']:>8.3f} "
+              f"{elapsed:>6.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки smart_advisor")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    backends_parser = subparsers.add_parser('backends', help="Паритет и скорость ONNX/int8 бэкендов против fp32")
+    backends_parser.add_argument('--backends', nargs='+', default=['int8', 'onnx'],
+                                 choices=[b for b in BACKENDS if b != 'torch'])
+    backends_parser.add_argument('--limit', type=int, default=500)
+    backends_parser.add_argument('--batch-size', type=int, default=config.EMBEDDING_CONFIG['batch_size'])
+    backends_parser.set_defaults(func=run_backends)
+
+    workers_parser = subparsers.add_parser('workers', help="Пропускная способность пула процессов эмбеддингов")
+    workers_parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4])
+    workers_parser.add_argument('--threads-per-worker', type=int, default=None)
+    workers_parser.add_argument('--shard-size', type=int, default=config.EMBEDDING_CONFIG['shard_size'])
+    workers_parser.add_argument('--limit', type=int, default=None)
+    workers_parser.add_argument('--batch-size', type=int, default=config.EMBEDDING_CONFIG['batch_size'])
+    workers_parser.set_defaults(func=run_workers)
+
+    compact_parser = subparsers.add_parser('compact', help="Память и recall@k компактного хранилища векторов")
+    compact_parser.add_argument('--code-types', nargs='+', default=list(CODE_TYPES), choices=CODE_TYPES)
+    compact_parser.add_argument('--rerank-factor', type=int, default=config.VECTOR_DB_CONFIG['rerank_factor'])
+    compact_parser.add_argument('--replicate', type=int, default=1)
+    compact_parser.add_argument('--limit', type=int, default=None)
+    compact_parser.add_argument('-k', type=int, default=10)
+    compact_parser.set_defaults(func=run_compact)
+
+    search_parser = subparsers.add_parser('search', help="Задержка поиска: Chroma против NumPy-бэкенда")
+    search_parser.add_argument('-k', type=int, default=10)
+    search_parser.add_argument('--repeats', type=int, default=20)
+    search_parser.set_defaults(func=run_search)
+
+    hnsw_parser = subparsers.add_parser('hnsw', help="Перебор параметров HNSW: recall@k, задержка и время сборки")
+    hnsw_parser.add_argument('--m', nargs='+', type=int, default=[8, 16, 32])
+    hnsw_parser.add_argument('--construction-ef', nargs='+', type=int, default=[100, 200])
+    hnsw_parser.add_argument('--search-ef', nargs='+', type=int, default=[10, 50, 100])
+    hnsw_parser.add_argument('--limit', type=int, default=None)
+    hnsw_parser.add_argument('-k', type=int, default=10)
+    hnsw_parser.add_argument('--repeats', type=int, default=5)
+    hnsw_parser.set_defaults(func=run_hnsw)
+
+    rerank_parser = subparsers.add_parser('rerank', help="Кросс-энкодер: как часто меняется top-1 и сколько добавляет задержки")
+    rerank_parser.add_argument('-k', type=int, default=10)
+    rerank_parser.add_argument('--top-n', type=int, default=config.RERANK_CONFIG['top_n'])
+    rerank_parser.add_argument('--time-budget-ms', type=float, default=config.RERANK_CONFIG['time_budget_ms'])
+    rerank_parser.add_argument('--repeats', type=int, default=5)
+    rerank_parser.set_defaults(func=run_rerank)
+
+    parsers_parser = subparsers.add_parser('parsers', help="Парсеры PDF: страниц в секунду и качество текста")
+    parsers_parser.add_argument('--parsers', nargs='+', default=['pymupdf', 'pypdf2'])
+    parsers_parser.add_argument('--limit', type=int, default=None)
+    parsers_parser.set_defaults(func=run_parsers)
+
+    chunks_parser = subparsers.add_parser('chunks', help="Длины фрагментов в токенах: абзацы против разбиения по токенам")
+    chunks_parser.add_argument('--limit', type=int, default=None)
+    chunks_parser.add_argument('--target-tokens', type=int, default=config.CHUNK_CONFIG['target_tokens'])
+    chunks_parser.add_argument('--overlap-tokens', type=int, default=config.CHUNK_CONFIG['overlap_tokens'])
+    chunks_parser.set_defaults(func=run_chunks)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,17 @@
+import argparse
 import logging
 import sys
 import os
-from tqdm import tqdm
+import time
 from smart_advisor.services.file_loader import FileLoader
+from smart_advisor.services.watcher import DirectoryWatcher
 from smart_advisor.core.embeddings import EmbeddingService
+from smart_advisor.core.embedding_workers import EmbeddingWorkerPool
 from smart_advisor.core.database import VectorDatabase
-from smart_advisor.core.models import Document
+from smart_advisor.core.document_processor import DocumentProcessor
+from smart_advisor.core.pipeline import IngestionPipeline
+from smart_advisor.core.chunking import chunk_document
 from smart_advisor.config import settings
-import uuid
 
 logging.basicConfig(
     level=logging.INFO,
@@ -19,34 +23,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def preprocess_text(text: str) -> str:
-    text = ' '.join(text.split())
-    text = text.lower()
-    return text.strip()
-
-def split_into_paragraphs(text: str) -> list:
-    paragraphs = [p.strip() for p in text.split('\n\n')]
-    return [p for p in paragraphs if p]
-
-def process_document(doc: Document, embedder: EmbeddingService) -> list:
-#Обработка одного документа: разбиение наабзацы и генерация эмбеддингов ((( ПОСМОТРЕТЬ ЕЩЕ РАЗ
-    processed_docs = []
-    paragraphs = split_into_paragraphs(doc.text)
-    
-    for paragraph in paragraphs:
-        if paragraph.strip():
-            new_doc = Document(
-                text=preprocess_text(paragraph),
-                metadata=doc.metadata.copy(),
-                id=str(uuid.uuid4())
-            )
-            embedding = embedder.generate_single(new_doc.text)
-            new_doc.set_embedding(embedding)
-            processed_docs.append(new_doc)
-    
-    return processed_docs
-
-def generate_embeddings():
+def generate_embeddings(full_rebuild: bool = False):
     try:
         print("\n=== Генерация эмбеддингов ===")
         logger.info("Начало генерации эмбеддингов...")
@@ -61,52 +38,55 @@ def generate_embeddings():
         file_loader = FileLoader()
         print("✓ FileLoader создан")
         
-        embedder = EmbeddingService()
-        print("✓ EmbeddingService создан")
-        
-        vector_db = VectorDatabase(embedder)
-        print("✓ VectorDatabase создана")
+        pool = None
+        if settings.EMBEDDING_CONFIG['workers'] > 1:
+            pool = EmbeddingWorkerPool()
+            print(f"✓ Пул эмбеддингов: {pool.workers} процессов по {pool.threads_per_worker} потоков")
 
-        print("\nЗагрузка документов...")
-        documents = file_loader.load_documents()
+        embedder = EmbeddingService(pool=pool)
+        print("✓ EmbeddingService создан")
         
-        if not documents:
-            print("⚠️ Документы не найдены")
-            logger.warning("Документы не найдены")
+        # Загрузка, разбиение, эмбеддинги и запись идут потоком: записанное до сбоя остаётся в индексе,
+        # в памяти не больше нескольких батчей фрагментов
+        mode = "полная пересборка в новую версию" if full_rebuild else "синхронизация активной версии"
+        print(f"\nПотоковая обработка документов ({mode}, батч {settings.INGEST_CONFIG['batch_size']} фрагментов, "
+              f"процессов эмбеддингов: {pool.workers if pool else 1})...")
+        try:
+            if full_rebuild:
+                # Полная пересборка идёт через журнал: прерванная сборка продолжается в той же версии
+                processor = DocumentProcessor(embedding_service=embedder, file_loader=file_loader)
+                print("✓ DocumentProcessor создан")
+                stats = processor.process_documents(full_rebuild=True)
+            else:
+                vector_db = VectorDatabase(embedder)
+                print("✓ VectorDatabase создана")
+                pipeline = IngestionPipeline(vector_db, embedder, chunk_document)
+                stats = pipeline.run(file_loader.iter_documents(), full_rebuild=False)
+        except Exception as e:
+            print(f"❌ Ошибка при обработке документов: {str(e)}")
+            logger.error(f"Ошибка при обработке документов: {str(e)}")
+            if full_rebuild:
+                print("Недостроенная версия сохранена, повторный запуск с --full продолжит сборку")
             return
-        
-        print(f"✓ Загружено {len(documents)} документов")
-        logger.info(f"Загружено {len(documents)} документов")
+        finally:
+            if pool is not None:
+                pool.close()
 
-        print("\nГенерация эмбеддингов и добавление в базу данных...")
-        all_processed_docs = []
-        
-        for i, doc in enumerate(tqdm(documents, desc="Обработка документов")):
-            try:
-                print(f"\nОбработка документа {i+1}/{len(documents)}: {doc.metadata.get('source', 'unknown')}")
-                processed_docs = process_document(doc, embedder)
-                all_processed_docs.extend(processed_docs)
-                print(f"✓ Обработано {len(processed_docs)} абзацев")
-            except Exception as e:
-                print(f"⚠️ Ошибка при обработке документа {i+1}: {str(e)}")
-                logger.error(f"Ошибка при обработке документа {i+1}: {str(e)}")
-                continue
-        
-        if not all_processed_docs:
-            print("⚠️ Не удалось обработать ни один документ")
-            logger.error("Не удалось обработать ни один документ")
+        if not stats['documents']:
+            print("⚠️ Документы не найдены")
             return
 
-        print("\nОбновление базы данных...")
-        try:
-            vector_db.clear()
-            vector_db.add_documents(all_processed_docs)
-            print(f"✓ Добавлено {len(all_processed_docs)} документов в базу данных")
-            logger.info(f"Добавлено {len(all_processed_docs)} документов в базу данных")
-        except Exception as e:
-            print(f"❌ Ошибка при обновлении базы данных: {str(e)}")
-            logger.error(f"Ошибка при обновлении базы данных: {str(e)}")
-            return
+        unchanged = stats['chunks'] - stats['embedded']
+        rate = stats['embedded'] / stats['embed_seconds'] if stats['embed_seconds'] > 0 else float('inf')
+        print(f"✓ Документов: {stats['documents']}, фрагментов: {stats['chunks']} "
+              f"({stats['embedded']} новых, {unchanged} без изменений, {stats['deleted']} удалено)")
+        print(f"✓ Эмбеддинги: {rate:.1f} фрагментов/сек")
+        print(f"✓ Время стадий: загрузка {stats['load_seconds']:.1f}с, разбиение {stats['chunk_seconds']:.1f}с, "
+              f"эмбеддинги {stats['embed_seconds']:.1f}с, запись {stats['write_seconds']:.1f}с, "
+              f"всего {stats['total_seconds']:.1f}с")
+        if stats.get('version'):
+            print(f"✓ Активная версия коллекции: {stats['version']}")
+        logger.info(f"Потоковая обработка: {stats}")
         
         print("\n=== Генерация эмбеддингов успешно завершена ===")
         logger.info("Генерация эмбеддингов успешно завершена")
@@ -116,5 +96,63 @@ def generate_embeddings():
         logger.error(f"Критическая ошибка: {str(e)}")
         return
 
+def export_snapshot(path: str = None):
+    try:
+        vector_db = VectorDatabase(EmbeddingService())
+        start_time = time.time()
+        snapshot_path = vector_db.export_snapshot(path)
+        print(f"✓ Снимок индекса {snapshot_path} ({vector_db.active_version}) записан за {time.time() - start_time:.1f}с")
+        logger.info(f"Снимок индекса {snapshot_path} записан")
+    except Exception as e:
+        print(f"❌ Ошибка при экспорте снимка: {str(e)}")
+        logger.error(f"Ошибка при экспорте снимка: {str(e)}")
+
+
+def import_snapshot(path: str):
+    try:
+        vector_db = VectorDatabase(EmbeddingService())
+        version = vector_db.import_snapshot(path)
+        print(f"✓ Снимок {path} загружен в новую версию коллекции {version}")
+        logger.info(f"Снимок {path} загружен в новую версию коллекции {version}")
+    except Exception as e:
+        print(f"❌ Ошибка при импорте снимка: {str(e)}")
+        logger.error(f"Ошибка при импорте снимка: {str(e)}")
+
+def watch(report_interval: float = 60.0):
+    # Сначала индекс синхронизируется с директориями, затем изменения подхватываются по мере появления
+    generate_embeddings()
+    embedder = EmbeddingService()
+    watcher = DirectoryWatcher(VectorDatabase(embedder), embedder)
+    watcher.start()
+    print("\n✓ Слежение за директориями запущено (Ctrl+C - остановка)")
+    try:
+        while True:
+            time.sleep(report_interval)
+            stats = watcher.stats()
+            print(f"Файлов переиндексировано: {stats['files_indexed']}, удалено: {stats['files_deleted']}, "
+                  f"ошибок: {stats['errors']}, задержка свежести p50 {stats['freshness_lag_p50_s']:.1f}с, "
+                  f"p99 {stats['freshness_lag_p99_s']:.1f}с")
+    except KeyboardInterrupt:
+        print("\nОстановка слежения...")
+    finally:
+        watcher.stop()
+        logger.info(f"Слежение остановлено: {watcher.stats()}")
+
+
 if __name__ == "__main__":
-    generate_embeddings() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Генерация эмбеддингов и обновление векторной базы")
+    parser.add_argument('--full', action='store_true', help="Полная пересборка в новую версию коллекции")
+    parser.add_argument('--export-snapshot', nargs='?', const='', metavar='PATH',
+                        help="Записать активную версию в однофайловый снимок (по умолчанию snapshot_path из настроек)")
+    parser.add_argument('--import-snapshot', metavar='PATH', help="Загрузить снимок в новую версию коллекции")
+    parser.add_argument('--watch', action='store_true',
+                        help="После синхронизации следить за HTML_DIR/PDF_DIR и переиндексировать изменённые файлы")
+    args = parser.parse_args()
+    if args.export_snapshot is not None:
+        export_snapshot(args.export_snapshot or None)
+    elif args.import_snapshot:
+        import_snapshot(args.import_snapshot)
+    elif args.watch:
+        watch()
+    else:
+        generate_embeddings(full_rebuild=args.full)
@@ -5,10 +5,14 @@ setup(
     version="0.1",
     packages=find_packages(),
     install_requires=[
-        'chromadb>=0.4.0',
-        'sentence-transformers>=2.2.0',
+        'chromadb>=0.5.0',
+        'sentence-transformers>=3.2.0',
         'pymupdf>=1.22.0',
         'beautifulsoup4>=4.12.0',
         'python-dotenv>=1.0.0',
+        'nltk>=3.8.0',
     ],
+    extras_require={
+        'onnx': ['optimum[onnxruntime]>=1.23.0'],
+    },
 )
\ No newline at end of file
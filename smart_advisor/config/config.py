@@ -55,13 +55,44 @@ VECTOR_DB_CONFIG = {
     "persist_directory": str(BASE_DIR / "data" / "chroma"),
     "collection_name": "documents",
     "distance_metric": "cosine",
-    "max_results": 5
+    # Параметры HNSW-индекса Chroma (M, ef при построении и при поиске); построение применяется к новым коллекциям.
+    # Подбираются по данным: python benchmark.py hnsw
+    "hnsw_m": 16,
+    "hnsw_construction_ef": 100,
+    "hnsw_search_ef": 10,
+    "max_results": 5,
+    # 'chroma' - HNSW-индекс Chroma, 'numpy' - точный поиск по матрице в памяти процесса,
+    # 'snapshot' - только чтение из однофайлового снимка (generate_embeddings.py --export-snapshot)
+    "backend": "chroma",
+    "numpy_directory": str(BASE_DIR / "data" / "numpy_index"),
+    "snapshot_path": str(BASE_DIR / "data" / "index.snapshot"),
+    "mmap": False,
+    # Версии коллекции при пересборке: сколько старых хранить для отката и как часто проверять псевдоним (сек)
+    "keep_versions": 2,
+    "alias_check_interval": 5.0,
+    # Компактное хранение: None, 'int8' или 'float16'; точный пересчёт для rerank_factor * k кандидатов
+    "compression": None,
+    "rerank_factor": 4
 }
 
 EMBEDDING_CONFIG = {
     'model_name': 'sberbank-ai/sbert_large_nlu_ru',
     'device': 'cpu',
-    'cache_folder': str(MODELS_DIR)
+    'cache_folder': str(MODELS_DIR),
+    'batch_size': 64,
+    # 'torch' - исходная fp32-модель, 'int8' - динамическое квантование torch,
+    # 'onnx' - ONNX Runtime (int8, если задан onnx_quantization: 'avx2', 'avx512', 'avx512_vnni', 'arm64')
+    'backend': 'torch',
+    'onnx_quantization': 'avx2',
+    'onnx_dir': str(MODELS_DIR / 'onnx'),
+    # Пул процессов для пересборки корпуса: 1 - без пула; threads_per_worker=None - поровну ядер на процесс
+    'workers': 1,
+    'threads_per_worker': None,
+    'shard_size': 256,
+    # Микробатчинг запросов: одновременные запросы в пределах окна считаются одним батчем
+    'query_batching': True,
+    'query_batch_window_ms': 5,
+    'query_batch_max_size': 32
 }
 
 CACHE_CONFIG = {
@@ -71,12 +102,62 @@ CACHE_CONFIG = {
     "cleanup_interval": 300,
     "transformers_cache": str(MODEL_DIR),
     "hf_home": str(CACHE_DIR),
-    "chroma_cache": str(CACHE_DIR / "chroma")
+    "chroma_cache": str(CACHE_DIR / "chroma"),
+    "embedding_cache_enabled": True,
+    "embedding_cache_dir": str(CACHE_DIR / "embeddings"),
+    "query_cache_size": 2048,
+    # Кэш текста, извлечённого из HTML/PDF: ключ - путь, размер, mtime, хэш содержимого и версии парсеров
+    "extraction_cache_enabled": True,
+    "extraction_cache_dir": str(CACHE_DIR / "extraction")
+}
+
+# Переранжирование результатов поиска кросс-энкодером перед извлечением ответа
+RERANK_CONFIG = {
+    "enabled": False,
+    "model_name": "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1",
+    "device": "cpu",
+    "max_length": 256,
+    # Мелкие батчи: бюджет проверяется между ними, а при 10 кандидатах батч 16 - это один вызов без проверки
+    "batch_size": 4,
+    # Сколько лучших фрагментов оставить и сколько времени (мс) можно потратить на один запрос
+    "top_n": 5,
+    "time_budget_ms": 150
 }
 
 FILE_CONFIG = {
     'supported_extensions': {'.html', '.pdf'},
-    'max_file_size': 10 * 1024 * 1024
+    'max_file_size': 10 * 1024 * 1024,
+    # Параллельное извлечение текста PDF: число процессов (1 - последовательно в основном процессе)
+    # и деление файлов больше large_pdf_bytes на задачи по pdf_pages_per_task страниц
+    'extraction_workers': max(1, min(4, (os.cpu_count() or 1) - 1)),
+    'pdf_pages_per_task': 50,
+    'large_pdf_bytes': 5 * 1024 * 1024
+}
+
+# Потоковая загрузка документов: фрагментов в батче эмбеддинга/записи и размер очередей между стадиями;
+# журнал контрольных точек DocumentProcessor, по которому прерванная загрузка продолжается с места остановки
+INGEST_CONFIG = {
+    'batch_size': 512,
+    'queue_size': 4,
+    'journal_path': str(DATA_DIR / 'ingest_journal.jsonl')
+}
+
+# Разбиение документов на фрагменты по токенам токенизатора модели эмбеддингов: фрагмент собирается
+# из целых предложений до target_tokens, соседние фрагменты перекрываются на overlap_tokens;
+# хвост короче min_tokens присоединяется к предыдущему, если не превышен предел модели max_tokens
+CHUNK_CONFIG = {
+    'target_tokens': 256,
+    'overlap_tokens': 32,
+    'min_tokens': 32,
+    'max_tokens': 510
+}
+
+# Слежение за HTML_DIR/PDF_DIR: файл переиндексируется, когда события по нему затихли на debounce_seconds;
+# watchdog (inotify и аналоги) при наличии, иначе или при use_polling - опрос раз в poll_interval секунд
+WATCHER_CONFIG = {
+    'debounce_seconds': 2.0,
+    'poll_interval': 5.0,
+    'use_polling': False
 }
 
 class Config:
@@ -96,7 +177,12 @@ class Config:
  
         self.SEARCH_CONFIG = {
             'k': 5, 
-            'score_threshold': 0.2  #порог релевантности
+            'score_threshold': 0.2,  #порог релевантности
+            'hybrid': True,  # BM25 по основам слов + векторный поиск, объединение reciprocal rank fusion
+            'fusion_candidates': 30,  # сколько кандидатов берётся из каждого поиска перед объединением
+            'rrf_k': 60,
+            'bm25_k1': 1.5,
+            'bm25_b': 0.75
         }
         
         self.ensure_directories()
@@ -117,10 +203,17 @@ class Config:
     LOG_DIR = LOG_DIR
     CACHE_DIR = CACHE_DIR
     MODEL_DIR = MODEL_DIR
+
+    #Максимальная длина текста, который возвращает BaseParser.parse
+    MAX_TEXT_LENGTH = 1_000_000
     LOG_CONFIG = LOG_CONFIG
     VECTOR_DB_CONFIG = VECTOR_DB_CONFIG
     FILE_CONFIG = FILE_CONFIG
     CACHE_CONFIG = CACHE_CONFIG
+    RERANK_CONFIG = RERANK_CONFIG
+    INGEST_CONFIG = INGEST_CONFIG
+    WATCHER_CONFIG = WATCHER_CONFIG
+    CHUNK_CONFIG = CHUNK_CONFIG
 
     #Настройки базы данных
     DATABASE_CONFIG = {
@@ -142,7 +235,8 @@ class Config:
             "html": {
                 "extract_metadata": True,
                 "extract_text": True,
-                "clean_text": True
+                "clean_text": True,
+                "exclude_tags": ["script", "style", "nav", "footer"]
             },
             "pdf": {
                 "extract_metadata": True,
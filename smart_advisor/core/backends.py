@@ -0,0 +1,126 @@
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+
+from ..config.config import config
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('torch', 'onnx', 'int8')
+
+
+def onnx_export_dir(model_name: str) -> Path:
+    return Path(config.EMBEDDING_CONFIG['onnx_dir']) / model_name.replace('/', '__')
+
+
+def onnx_file_name(quantization: Optional[str] = None) -> str:
+    # Имя задаётся явно (file_suffix): по умолчанию sentence-transformers называет файл по типу весов,
+    # который зависит от набора инструкций (quint8 для avx2, qint8 для arm64)
+    return f"model_int8_{quantization}.onnx" if quantization else "model.onnx"
+
+
+def export_onnx_model(model_name: str, quantization: Optional[str] = None) -> Path:
+    # Экспорт модели в ONNX (и, если задано, динамическое int8-квантование под набор инструкций CPU).
+    # Нужен optimum[onnxruntime]: pip install smart_advisor[onnx]
+    try:
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+    except ImportError as e:
+        raise ImportError("Для ONNX-бэкенда нужен sentence-transformers>=3.2 и optimum[onnxruntime]") from e
+
+    export_dir = onnx_export_dir(model_name)
+    logger.info(f"Экспорт модели {model_name} в ONNX: {export_dir}")
+    model = SentenceTransformer(
+        model_name,
+        backend='onnx',
+        device='cpu',
+        cache_folder=config.EMBEDDING_CONFIG['cache_folder']
+    )
+    model.save_pretrained(str(export_dir))
+
+    if quantization:
+        logger.info(f"Квантование ONNX-модели в int8 ({quantization})")
+        export_dynamic_quantized_onnx_model(model, quantization, str(export_dir),
+                                            file_suffix=f"int8_{quantization}")
+
+    return export_dir
+
+
+def load_embedding_model(model_name: str, backend: Optional[str] = None, device: Optional[str] = None,
+                         num_threads: Optional[int] = None) -> SentenceTransformer:
+    backend = backend or config.EMBEDDING_CONFIG['backend']
+    device = device or config.EMBEDDING_CONFIG['device']
+    cache_folder = config.EMBEDDING_CONFIG['cache_folder']
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд эмбеддингов: {backend}. Доступны: {', '.join(BACKENDS)}")
+
+    logger.info(f"Загрузка модели {model_name} (бэкенд: {backend}, устройство: {device})")
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    if backend == 'torch':
+        return SentenceTransformer(model_name, device=device, cache_folder=cache_folder)
+
+    if backend == 'int8':
+        # Динамическое квантование Linear-слоёв: веса int8, активации квантуются на лету, только CPU
+        model = SentenceTransformer(model_name, device='cpu', cache_folder=cache_folder)
+        model.eval()
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+    quantization = config.EMBEDDING_CONFIG['onnx_quantization']
+    file_name = onnx_file_name(quantization)
+    export_dir = onnx_export_dir(model_name)
+    exported = list(export_dir.rglob(file_name)) if export_dir.exists() else []
+    if not exported:
+        export_onnx_model(model_name, quantization)
+        exported = list(export_dir.rglob(file_name))
+    if not exported:
+        raise FileNotFoundError(f"После экспорта в {export_dir} не найден файл модели {file_name}")
+
+    model_kwargs = {
+        'file_name': exported[0].relative_to(export_dir).as_posix(),
+        'provider': 'CPUExecutionProvider'
+    }
+    if num_threads:
+        import onnxruntime
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = num_threads
+        model_kwargs['session_options'] = session_options
+
+    return SentenceTransformer(
+        str(export_dir),
+        backend='onnx',
+        device='cpu',
+        model_kwargs=model_kwargs
+    )
+
+
+def token_lengths(model: SentenceTransformer, texts: List[str]) -> List[int]:
+    encoded = model.tokenizer(texts, add_special_tokens=False, truncation=False)
+    return [len(ids) for ids in encoded['input_ids']]
+
+
+def encode_length_sorted(model: SentenceTransformer, texts: List[str], batch_size: int) -> np.ndarray:
+    # Тексты сортируются по длине в токенах, чтобы в одном батче
+    # оказывались входы близкой длины и паддинг был минимальным.
+    dimension = model.get_sentence_embedding_dimension()
+    if not texts:
+        return np.empty((0, dimension), dtype=np.float32)
+
+    order = np.argsort(token_lengths(model, texts), kind='stable')[::-1]
+
+    embeddings = np.empty((len(texts), dimension), dtype=np.float32)
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        embeddings[idx] = model.encode(
+            [texts[i] for i in idx],
+            batch_size=len(idx),
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+    return embeddings
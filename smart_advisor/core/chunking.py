@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from ..config.config import config
+from ..models import Document
+from .model_registry import get_tokenizer
+from .tagging import detect_document_type, tag_chunk
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def chunk_id(source: str, position: int, text: str) -> str:
+    # Детерминированный id фрагмента: один и тот же файл, позиция и текст всегда дают один id,
+    # поэтому при пересборке неизменённые фрагменты можно пропустить
+    source_hash = hashlib.blake2b(str(source).encode('utf-8'), digest_size=6).hexdigest()
+    return f"{source_hash}-{position:05d}-{content_hash(text)}"
+
+
+def preprocess_text(text: str) -> str:
+    text = ' '.join(text.split())
+    text = text.lower()
+    return text.strip()
+
+
+# Конец предложения: . ! ? … перед пробелом и заглавной буквой, цифрой или открывающей кавычкой/скобкой
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])\s+(?=[«"(\[]?[А-ЯЁA-Z0-9])')
+# Сокращения, после которых точка не завершает предложение ("т.е. Положение", "ст. 36")
+ABBREVIATION = re.compile(r'(?:^|\s)(?:т\.\s?е|т\.\s?д|т\.\s?п|т\.\s?к|гг|ст|пп|см|рис|им|др|руб|тыс|млн)\.$',
+                          re.IGNORECASE)
+# Однобуквенные сокращения - только перед цифрой или строчной буквой ("п. 3", "ч. 2"):
+# в "2023 г. Стипендия назначается" точка завершает предложение
+SHORT_ABBREVIATION = re.compile(r'(?:^|\s)[гчп]\.$', re.IGNORECASE)
+ABBREVIATION_CONTINUATION = re.compile(r'[\da-zа-яё]')
+
+
+def _is_abbreviation(pending: str, following: str) -> bool:
+    return bool(ABBREVIATION.search(pending)) or \
+        bool(SHORT_ABBREVIATION.search(pending) and ABBREVIATION_CONTINUATION.match(following))
+
+
+def split_into_sentences(text: str) -> List[str]:
+    # Пустые строки - границы абзацев; одиночные переводы строк (перенос строки в PDF) границей не считаются
+    sentences = []
+    for block in re.split(r'\n\s*\n', text):
+        block = ' '.join(block.split())
+        if not block:
+            continue
+        pending = ''
+        parts = SENTENCE_BOUNDARY.split(block)
+        for i, part in enumerate(parts):
+            pending = f"{pending} {part}" if pending else part
+            if not _is_abbreviation(pending, parts[i + 1] if i + 1 < len(parts) else ''):
+                sentences.append(pending)
+                pending = ''
+        if pending:
+            sentences.append(pending)
+    return sentences
+
+
+def token_counts(tokenizer, texts: List[str]) -> List[int]:
+    if not texts:
+        return []
+    encoded = tokenizer(texts, add_special_tokens=False, truncation=False)
+    return [len(ids) for ids in encoded['input_ids']]
+
+
+def _split_long_sentence(tokenizer, sentence: str, max_tokens: int) -> List[Tuple[str, int]]:
+    # Предложение длиннее фрагмента (таблица, список без точек) режется по словам;
+    # WordPiece токенизирует слова независимо, поэтому длины слов складываются
+    words = sentence.split()
+    pieces, current, current_tokens = [], [], 0
+    for word, tokens in zip(words, token_counts(tokenizer, words)):
+        if current and current_tokens + tokens > max_tokens:
+            pieces.append((' '.join(current), current_tokens))
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += tokens
+    if current:
+        pieces.append((' '.join(current), current_tokens))
+    return pieces
+
+
+def split_into_chunks(text: str, tokenizer=None, target_tokens: Optional[int] = None,
+                      overlap_tokens: Optional[int] = None, min_tokens: Optional[int] = None) -> List[str]:
+    # Фрагменты из целых предложений размером около target_tokens токенов модели эмбеддингов:
+    # ни один не обрезается моделью, и батчи эмбеддингов получаются из входов близкой длины
+    tokenizer = tokenizer or get_tokenizer()
+    max_tokens = config.CHUNK_CONFIG['max_tokens']
+    target_tokens = min(target_tokens or config.CHUNK_CONFIG['target_tokens'], max_tokens)
+    overlap_tokens = config.CHUNK_CONFIG['overlap_tokens'] if overlap_tokens is None else overlap_tokens
+    min_tokens = config.CHUNK_CONFIG['min_tokens'] if min_tokens is None else min_tokens
+
+    sentences = [preprocess_text(sentence) for sentence in split_into_sentences(text)]
+    units: List[Tuple[str, int]] = []
+    for sentence, tokens in zip(sentences, token_counts(tokenizer, sentences)):
+        if tokens > target_tokens:
+            units.extend(_split_long_sentence(tokenizer, sentence, target_tokens))
+        elif tokens:
+            units.append((sentence, tokens))
+
+    chunks: List[List[Tuple[str, int]]] = []
+    current: List[Tuple[str, int]] = []
+    current_tokens, overlap_count, overlap_size = 0, 0, 0
+    for unit in units:
+        # Фрагмент закрывается на target_tokens, но если нового (кроме перекрытия) в нём меньше min_tokens,
+        # он дорастает до max_tokens, чтобы не выпускать обрывки посреди текста
+        if current and current_tokens + unit[1] > target_tokens and \
+                (current_tokens - overlap_size >= min_tokens or current_tokens + unit[1] > max_tokens):
+            chunks.append(current)
+            # Перекрытие: последние предложения предыдущего фрагмента в пределах overlap_tokens
+            overlap, overlap_size = [], 0
+            for previous in reversed(current):
+                if overlap_size + previous[1] > overlap_tokens or overlap_size + previous[1] + unit[1] > target_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += previous[1]
+            current, current_tokens, overlap_count = overlap, overlap_size, len(overlap)
+        current.append(unit)
+        current_tokens += unit[1]
+
+    if current:
+        tail = current[overlap_count:]
+        tail_tokens = sum(tokens for _, tokens in tail)
+        if chunks and tail_tokens < min_tokens and \
+                sum(tokens for _, tokens in chunks[-1]) + tail_tokens <= max_tokens:
+            chunks[-1].extend(tail)
+        else:
+            chunks.append(current)
+
+    return [' '.join(sentence for sentence, _ in chunk) for chunk in chunks]
+
+
+def process_document(doc: Document) -> List[Document]:
+    # Обработка одного документа: разбиение на фрагменты по токенам, эмбеддинги считаются батчами в IngestionPipeline
+    processed_docs = []
+    document_type = detect_document_type(doc.metadata, doc.text)
+
+    for text in split_into_chunks(doc.text):
+        processed_docs.append(Document(
+            id=chunk_id(doc.metadata.get('source', doc.id), len(processed_docs), text),
+            text=text,
+            metadata={**doc.metadata, **tag_chunk(text, doc.metadata, document_type)}
+        ))
+
+    return processed_docs
+
+
+def chunk_document(doc: Document) -> Optional[List[Document]]:
+    # Ошибка в одном документе не останавливает потоковую обработку остальных;
+    # None - ошибка разбиения (прежние фрагменты документа трогать нельзя), [] - документ без текста
+    try:
+        processed_docs = process_document(doc)
+        logger.info(f"Обработано {len(processed_docs)} фрагментов: {doc.metadata.get('source', 'unknown')}")
+        return processed_docs
+    except Exception as e:
+        logger.error(f"Ошибка при обработке документа {doc.metadata.get('source', 'unknown')}: {str(e)}")
+        return None
@@ -1,43 +1,569 @@
+import copy
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
 import chromadb
+import numpy as np
+from chromadb.api.client import SharedSystemClient
 from chromadb.config import Settings
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
 
 from ..config.config import config
 from ..models import Document, SearchResult
 from .embeddings import EmbeddingService
+from .lexical_index import LexicalIndex, Tokenizer, reciprocal_rank_fusion
+from .numpy_index import NumpyCollection
+from .snapshot import SnapshotCollection, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+ALIAS_NAME = "documents"
+
+
+def hnsw_metadata(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    # Метаданные коллекции Chroma с параметрами HNSW из VECTOR_DB_CONFIG; overrides - для перебора в benchmark.py
+    metadata = {
+        "hnsw:space": config.VECTOR_DB_CONFIG['distance_metric'],
+        "hnsw:M": config.VECTOR_DB_CONFIG['hnsw_m'],
+        "hnsw:construction_ef": config.VECTOR_DB_CONFIG['hnsw_construction_ef'],
+        "hnsw:search_ef": config.VECTOR_DB_CONFIG['hnsw_search_ef'],
+    }
+    metadata.update(overrides or {})
+    return metadata
+
+
+def flush_collection(collection) -> None:
+    # NumPy-коллекция откладывает полную перезапись до flush(), у Chroma его нет
+    flush = getattr(collection, 'flush', None)
+    if flush is not None:
+        flush()
+
+
+def read_alias(root: Path) -> str:
+    try:
+        with open(Path(root) / "alias.json", 'r', encoding='utf-8') as f:
+            return json.load(f)[ALIAS_NAME]
+    except FileNotFoundError:
+        return ALIAS_NAME
+
 
 class VectorDatabase:
     
     def __init__(self, embedding_service: EmbeddingService):
-        self.client = chromadb.Client(Settings(
+        self.backend = config.VECTOR_DB_CONFIG['backend']
+        self.embedding_service = embedding_service
+
+        if self.backend == 'numpy':
+            self.client = None
+            self.root = Path(config.VECTOR_DB_CONFIG['numpy_directory'])
+        elif self.backend == 'snapshot':
+            self.client = None
+            self.root = Path(config.VECTOR_DB_CONFIG['snapshot_path']).parent
+        else:
+            self.client = self._new_client()
+            self.root = Path(config.DB_PATH)
+
+        # Псевдоним "documents" указывает на активную версию коллекции (alias.json);
+        # без файла псевдонима используется исходная коллекция "documents".
+        # Запись в версию на месте отмечается не в alias.json, а в файле поколения этой версии (generations/)
+        self.alias_path = self.root / "alias.json"
+        self.active_version = self._read_alias()[ALIAS_NAME]
+        marker = self._read_generation(self.active_version)
+        self.generation, self.published_at = marker['generation'], marker['published_at']
+        self.collection = self._open_collection(self.active_version)
+        self._alias_checked_at = time.monotonic()
+        self._tokenizer: Optional[Tokenizer] = None
+        self._lexical: Optional[LexicalIndex] = None
+        self._lexical_version: Optional[str] = None
+        # Изменения активной версии, ещё не внесённые в лексический индекс: id -> новый текст, None - удалён
+        self._lexical_changes: Dict[str, Optional[str]] = {}
+
+    @staticmethod
+    def _new_client():
+        return chromadb.Client(Settings(
             persist_directory=str(config.DB_PATH),
             is_persistent=True
         ))
-        
-        self.embedding_service = embedding_service
-        
-        self.collection = self.client.get_or_create_collection(
-            name="documents",
-            embedding_function=self.embedding_service
+
+    def _create_numpy_collection(self, name: str) -> NumpyCollection:
+        return NumpyCollection(
+            str(self.root / name),
+            self.embedding_service,
+            mmap=config.VECTOR_DB_CONFIG['mmap'],
+            compression=config.VECTOR_DB_CONFIG['compression'],
+            rerank_factor=config.VECTOR_DB_CONFIG['rerank_factor']
+        )
+
+    def _open_collection(self, name: str, create: bool = False):
+        if self.backend == 'numpy':
+            return self._create_numpy_collection(name)
+        if self.backend == 'snapshot':
+            return SnapshotCollection(config.VECTOR_DB_CONFIG['snapshot_path'], self.embedding_service)
+        if create:
+            return self.client.create_collection(
+                name=name,
+                embedding_function=self.embedding_service,
+                metadata=hnsw_metadata()
+            )
+        return self.client.get_or_create_collection(
+            name=name,
+            embedding_function=self.embedding_service,
+            metadata=hnsw_metadata()
         )
+
+    def _require_writable(self) -> None:
+        # У снимка нет клиента Chroma и версий коллекции: он только для чтения, как и SnapshotCollection
+        if self.backend == 'snapshot':
+            raise ValueError(f"Снимок индекса {config.VECTOR_DB_CONFIG['snapshot_path']} доступен только для чтения")
+
+    def _delete_collection(self, name: str) -> None:
+        self._require_writable()
+        if self.backend == 'numpy':
+            shutil.rmtree(self.root / name, ignore_errors=True)
+        else:
+            self.client.delete_collection(name)
+        self._lexical_path(name).unlink(missing_ok=True)
+        self._generation_path(name).unlink(missing_ok=True)
+
+    def _lexical_path(self, version: str) -> Path:
+        return self.root / "lexical" / f"{version}.npz"
+
+    def _generation_path(self, version: str) -> Path:
+        return self.root / "generations" / f"{version}.json"
+
+    def _new_lexical_index(self) -> LexicalIndex:
+        if self._tokenizer is None:
+            self._tokenizer = Tokenizer()
+        return LexicalIndex(self._tokenizer, config.SEARCH_CONFIG['bm25_k1'], config.SEARCH_CONFIG['bm25_b'])
+
+    def _build_lexical(self, collection, version: str) -> LexicalIndex:
+        # Инвертированный индекс строится по текстам из самой коллекции и сохраняется рядом с ней
+        start_time = time.perf_counter()
+        indexed = collection.get(include=['documents'])
+        lexical = self._new_lexical_index().build(indexed['ids'], indexed['documents'])
+        lexical.save(self._lexical_path(version))
+        logger.info(f"Лексический индекс {version}: {len(lexical)} фрагментов, {len(lexical.terms)} терминов "
+                    f"за {time.perf_counter() - start_time:.2f}с")
+        if version == self.active_version:
+            self._lexical, self._lexical_version = lexical, version
+        return lexical
+
+    @property
+    def lexical(self) -> LexicalIndex:
+        if self.backend == 'snapshot':
+            # Лексический индекс лежит в самом снимке
+            if self._lexical is None:
+                self._lexical = self.collection.lexical_index(self._new_lexical_index())
+            return self._lexical
+        if self._lexical is None or self._lexical_version != self.active_version:
+            path = self._lexical_path(self.active_version)
+            if path.exists():
+                self._lexical = self._new_lexical_index().load(path)
+                self._lexical_version = self.active_version
+            else:
+                # Версия собрана до появления гибридного поиска - индекс строится один раз при первом запросе
+                self._build_lexical(self.collection, self.active_version)
+        return self._lexical
+
+    def _read_alias(self) -> Dict[str, Any]:
+        try:
+            with open(self.alias_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {ALIAS_NAME: ALIAS_NAME}
+
+    def _write_alias(self, version: str) -> None:
+        # Запись во временный файл и os.replace - переключение атомарно для читающих процессов.
+        # alias.json пишут только процессы, переключающие версию (commit_version, rollback)
+        self.root.mkdir(parents=True, exist_ok=True)
+        committed = sorted(set(self.committed_versions()) | {version})
+        tmp_path = self.alias_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({ALIAS_NAME: version, 'switched_at': datetime.now().isoformat(), 'committed': committed}, f)
+        os.replace(tmp_path, self.alias_path)
+        self.active_version = version
+        self.collection = self._open_collection(version)
+        marker = self._read_generation(version)
+        self.generation, self.published_at = marker['generation'], marker['published_at']
+        self._lexical_changes = {}
+
+    def _read_generation(self, version: str) -> Dict[str, Any]:
+        try:
+            with open(self._generation_path(version), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'generation': 0, 'published_at': None}
+
+    def _publish(self) -> float:
+        # Новое поколение активной версии после записи на месте: файлы коллекции и лексического индекса
+        # уже на диске, читающие процессы по смене поколения переоткрывают их в refresh().
+        # Файл поколения свой у каждой версии, поэтому запись на месте не может откатить переключение псевдонима
+        path = self._generation_path(self.active_version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        marker = {'generation': self._read_generation(self.active_version)['generation'] + 1,
+                  'published_at': time.time()}
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(marker, f)
+        os.replace(tmp_path, path)
+        self.generation, self.published_at = marker['generation'], marker['published_at']
+        return self.published_at
+
+    def refresh(self, force: bool = False) -> None:
+        # Подхватывает новую версию, переключённую другим процессом, без перезапуска
+        now = time.monotonic()
+        if not force and now - self._alias_checked_at < config.VECTOR_DB_CONFIG['alias_check_interval']:
+            return
+        self._alias_checked_at = now
+
+        if self.backend == 'snapshot':
+            if self.collection.changed():
+                logger.info(f"Снимок индекса обновлён, повторное открытие {config.VECTOR_DB_CONFIG['snapshot_path']}")
+                self.collection = self._open_collection(self.active_version)
+                self._lexical = None
+            return
+
+        version = self._read_alias()[ALIAS_NAME]
+        # Время публикации сравнивается вместе с номером: два процесса, пишущие в одну версию,
+        # могут выпустить одинаковый номер поколения
+        marker = self._read_generation(version)
+        if version != self.active_version:
+            logger.info(f"Переключение на версию коллекции {version} (была {self.active_version})")
+        elif (marker['generation'], marker['published_at']) != (self.generation, self.published_at):
+            logger.info(f"Версия коллекции {version} обновлена на месте (поколение {marker['generation']}), "
+                        f"повторное открытие")
+        else:
+            return
+        # Коллекция и лексический индекс держат данные в памяти - открываются заново с диска
+        if self.client is not None:
+            # Chroma держит загруженный HNSW-сегмент в общей System клиента (одна на persist_directory),
+            # и ни get_or_create_collection, ни новый Client с тем же путём его не перечитывают:
+            # System сбрасывается, иначе записанное другим процессом не видно векторному поиску
+            SharedSystemClient.clear_system_cache()
+            self.client = self._new_client()
+        self.collection = self._open_collection(version)
+        self.active_version = version
+        self.generation, self.published_at = marker['generation'], marker['published_at']
+        self._lexical = None
+        self._lexical_changes = {}
+
+    def _collection_names(self) -> List[str]:
+        self._require_writable()
+        if self.backend == 'numpy':
+            return [path.name for path in self.root.iterdir() if path.is_dir()] if self.root.exists() else []
+        return [c if isinstance(c, str) else c.name for c in self.client.list_collections()]
+
+    def versions(self) -> List[str]:
+        return sorted(name for name in self._collection_names() if name.startswith(f"{ALIAS_NAME}_v"))
+
+    def _has_legacy_collection(self) -> bool:
+        # Исходная коллекция "documents", собранная до появления версий, - такая же версия для отката
+        # и очистки, если в ней есть данные (пустую Chroma создаёт при первом открытии)
+        if ALIAS_NAME not in self._collection_names():
+            return False
+        collection = self.collection if self.active_version == ALIAS_NAME else self._open_collection(ALIAS_NAME)
+        return collection.count() > 0
+
+    def committed_versions(self) -> List[str]:
+        # Версии, которые включались через commit_version и ещё не удалены; недостроенные версии
+        # прерванных сборок сюда не попадают. В alias.json старого формата известна только активная,
+        # без alias.json активна исходная коллекция "documents"
+        alias = self._read_alias()
+        existing = set(self.versions())
+        if self._has_legacy_collection():
+            existing.add(ALIAS_NAME)
+        return sorted(v for v in alias.get('committed', [alias[ALIAS_NAME]]) if v in existing)
+
+    def rebuild(self, documents: List[Document]) -> str:
+        # Сборка новой версии рядом с активной: поиск продолжает работать по старой,
+        # пока новая не заполнена и не проверена, затем псевдоним переключается
+        version, collection = self.begin_version()
+        logger.info(f"Сборка новой версии коллекции {version}: {len(documents)} документов")
+        try:
+            self.add_to_version(collection, documents)
+        except Exception:
+            self.abort_version(version)
+            raise
+        return self.commit_version(version, collection, len(documents))
+
+    def begin_version(self) -> Tuple[str, Any]:
+        # Новая пустая версия; заполняется add_to_version (можно по частям) и включается commit_version
+        version = f"{ALIAS_NAME}_v{datetime.now():%Y%m%d%H%M%S}"
+        existing = set(self.versions())
+        suffix = 1
+        while version in existing:
+            version = f"{ALIAS_NAME}_v{datetime.now():%Y%m%d%H%M%S}_{suffix}"
+            suffix += 1
+        return version, self._open_collection(version, create=True)
+
+    def open_version(self, version: str):
+        return self._open_collection(version)
+
+    def add_to_version(self, collection, documents: List[Document]) -> None:
+        # upsert, а не add: при возобновлении прерванной сборки повторная запись фрагмента не ошибка
+        if documents:
+            collection.upsert(
+                documents=[doc.text for doc in documents],
+                embeddings=self._collect_embeddings(documents),
+                ids=[doc.id for doc in documents],
+                metadatas=[doc.metadata for doc in documents]
+            )
+
+    def commit_version(self, version: str, collection, expected_count: int) -> str:
+        try:
+            flush_collection(collection)
+            self._validate_version(collection, expected_count)
+            if config.SEARCH_CONFIG['hybrid']:
+                self._build_lexical(collection, version)
+        except Exception:
+            self.abort_version(version)
+            raise
+
+        previous = self.active_version
+        self._write_alias(version)
+        logger.info(f"Активная версия коллекции: {version} (была {previous})")
+        self._prune_versions()
+        return version
+
+    def abort_version(self, version: str) -> None:
+        logger.error(f"Версия {version} не прошла сборку или проверку, активной остаётся {self.active_version}")
+        self._delete_collection(version)
+
+    def _validate_version(self, collection, expected_count: int) -> None:
+        count = collection.count()
+        if count != expected_count:
+            raise ValueError(f"В новой версии {count} документов вместо {expected_count}")
+        if count:
+            sample = collection.get(limit=1, include=['embeddings'])
+            probe = collection.query(query_embeddings=[np.asarray(sample['embeddings'][0], dtype=np.float32)], n_results=1)
+            if not probe['ids'][0]:
+                raise ValueError("Проверочный запрос к новой версии не вернул результатов")
+
+    def _prune_versions(self) -> None:
+        keep = config.VECTOR_DB_CONFIG['keep_versions']
+        old_versions = [v for v in self.committed_versions() if v != self.active_version]
+        for version in old_versions[:max(0, len(old_versions) - keep)]:
+            logger.info(f"Удаление старой версии коллекции {version}")
+            self._delete_collection(version)
+
+    def export_snapshot(self, path: Optional[str] = None) -> Path:
+        # Один файл с векторами, текстами, метаданными и лексическим индексом активной версии;
+        # его можно скопировать на другой сервер и открыть с backend='snapshot'
+        path = Path(path or config.VECTOR_DB_CONFIG['snapshot_path'])
+        indexed = self.collection.get(include=['documents', 'metadatas', 'embeddings'])
+        ids, documents = indexed['ids'], indexed['documents']
+        embeddings = np.asarray(indexed['embeddings'], dtype=np.float32) if ids else np.empty((0, 0), dtype=np.float32)
+        lexical = self._new_lexical_index().build(ids, documents)
+        return write_snapshot(path, ids, documents, indexed['metadatas'], embeddings, lexical, info={
+            'version': self.active_version,
+            'model_name': config.EMBEDDING_CONFIG['model_name']
+        })
+
+    def import_snapshot(self, path: str) -> str:
+        # Загрузка снимка в изменяемый бэкенд как новой версии коллекции, без пересчёта эмбеддингов
+        snapshot = SnapshotCollection(path, self.embedding_service)
+        if snapshot.header.get('info', {}).get('model_name', config.EMBEDDING_CONFIG['model_name']) != \
+                config.EMBEDDING_CONFIG['model_name']:
+            raise ValueError(f"Снимок собран моделью {snapshot.header['info']['model_name']}, "
+                             f"а настроена {config.EMBEDDING_CONFIG['model_name']}")
+        documents = [
+            Document(id=id, text=snapshot.documents[i], metadata=snapshot.metadatas[i],
+                     embedding=np.array(snapshot.vectors[i]))
+            for i, id in enumerate(snapshot.ids)
+        ]
+        return self.rebuild(documents)
+
+    def rollback(self) -> str:
+        older = [v for v in self.committed_versions() if v < self.active_version]
+        if not older:
+            raise ValueError(f"Нет версии старше {self.active_version} для отката")
+        self._write_alias(older[-1])
+        logger.info(f"Откат на версию коллекции {older[-1]}")
+        return older[-1]
         
-    def add_documents(self, documents: List[Document]) -> None:
+    def add_documents(self, documents: List[Document], update_lexical: bool = True) -> None:
         if not documents:
             return
             
         self.collection.add(
             documents=[doc.text for doc in documents],
+            embeddings=self._collect_embeddings(documents),
+            ids=[doc.id for doc in documents],
+            metadatas=[doc.metadata for doc in documents]
+        )
+        self._lexical_changes.update((doc.id, doc.text) for doc in documents)
+        if update_lexical:
+            self.update_lexical()
+
+    def upsert_documents(self, documents: List[Document], update_lexical: bool = True) -> None:
+        # update_lexical=False - для записи потоком по частям, изменения вносятся в лексический индекс
+        # один раз в конце через update_lexical()
+        if not documents:
+            return
+
+        self.collection.upsert(
+            documents=[doc.text for doc in documents],
+            embeddings=self._collect_embeddings(documents),
             ids=[doc.id for doc in documents],
             metadatas=[doc.metadata for doc in documents]
         )
+        self._lexical_changes.update((doc.id, doc.text) for doc in documents)
+        if update_lexical:
+            self.update_lexical()
+
+    def delete_documents(self, ids: List[str], update_lexical: bool = True) -> None:
+        if ids:
+            self.collection.delete(ids=ids)
+            self._lexical_changes.update((id, None) for id in ids)
+            if update_lexical:
+                self.update_lexical()
+
+    def update_lexical(self) -> Optional[float]:
+        # Точка сброса отложенной записи: коллекция сбрасывается на диск, в лексический индекс
+        # вносятся только накопленные изменения - корпус заново не читается и не токенизируется.
+        # Возвращает время публикации нового поколения или None, если изменений не было
+        flush_collection(self.collection)
+        changes, self._lexical_changes = self._lexical_changes, {}
+        if not changes:
+            return None
+        if config.SEARCH_CONFIG['hybrid']:
+            start_time = time.perf_counter()
+            upserted = {id: text for id, text in changes.items() if text is not None}
+            # Обновляется копия: поиск в других потоках дочитывает прежние массивы
+            lexical = copy.copy(self.lexical).update(list(upserted), list(upserted.values()),
+                                                     [id for id, text in changes.items() if text is None])
+            lexical.save(self._lexical_path(self.active_version))
+            self._lexical, self._lexical_version = lexical, self.active_version
+            logger.info(f"Лексический индекс {self.active_version}: изменено фрагментов {len(changes)} "
+                        f"за {time.perf_counter() - start_time:.2f}с")
+        return self._publish()
+
+    def rebuild_lexical(self) -> float:
+        # Полная пересборка по текстам коллекции - когда изменения не известны поимённо,
+        # например после прерванной загрузки
+        flush_collection(self.collection)
+        self._lexical_changes = {}
+        if config.SEARCH_CONFIG['hybrid']:
+            self._build_lexical(self.collection, self.active_version)
+        return self._publish()
+
+    def indexed_ids(self) -> Set[str]:
+        # Манифест проиндексированного берётся из самого индекса, поэтому не расходится с ним
+        return set(self.collection.get(include=[])['ids'])
+
+    def indexed_metadata(self, collection=None, where: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        indexed = (collection or self.collection).get(where=where, include=['metadatas'])
+        return dict(zip(indexed['ids'], indexed['metadatas']))
+
+    def diff_documents(self, documents: List[Document]) -> Tuple[List[Document], List[str]]:
+        # Возвращает фрагменты, которых нет в индексе (или у которых поменялись метаданные),
+        # и id фрагментов, которых больше нет в файлах.
+        # id детерминированы (источник, позиция, хэш текста), так что изменённый фрагмент = новый id + удалённый id
+        indexed = self.indexed_metadata()
+        current = {doc.id for doc in documents}
+        new_documents = [doc for doc in documents if indexed.get(doc.id) != doc.metadata]
+        stale_ids = sorted(set(indexed) - current)
+        return new_documents, stale_ids
+
+    def _collect_embeddings(self, documents: List[Document]) -> np.ndarray:
+        # Уже посчитанные эмбеддинги берутся из документов, модель запускается только для остальных
+        rows = [doc.embedding for doc in documents]
+        missing = [i for i, row in enumerate(rows) if row is None]
+
+        if missing:
+            computed = self.embedding_service.encode_batch([documents[i].text for i in missing])
+            for i, embedding in zip(missing, computed):
+                rows[i] = embedding
+
+        logger.info(f"Добавление {len(documents)} документов: {len(documents) - len(missing)} с готовыми эмбеддингами, "
+                    f"{len(missing)} посчитано")
+        return np.asarray(rows, dtype=np.float32)
         
-    def search(self, query: str, k: int = None) -> List[SearchResult]:
+    def search(self, query: str, k: int = None, where: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
+        # where - фильтр по метаданным фрагментов в синтаксисе Chroma, например {"sch_social": True}
+        self.refresh()
+
+        if config.SEARCH_CONFIG['hybrid']:
+            query_embeddings = self.embedding_service.embed_queries([query], use_batcher=True)
+            return self._hybrid_search([query], query_embeddings, k, where)[0]
 
         results = self.collection.query(
             query_texts=[query],
-            n_results=k or config.SEARCH_CONFIG['k']
+            n_results=k or config.SEARCH_CONFIG['k'],
+            where=where
         )
         
+        return self._to_search_results(results, 0)
+
+    def search_many(self, queries: List[str], k: int = None,
+                    where: Optional[Dict[str, Any]] = None) -> List[List[SearchResult]]:
+        # Все запросы эмбеддятся одним батчем и отправляются в индекс одним вызовом
+        if not queries:
+            return []
+        self.refresh()
+
+        query_embeddings = self.embedding_service.embed_queries(queries)
+        if config.SEARCH_CONFIG['hybrid']:
+            return self._hybrid_search(queries, query_embeddings, k, where)
+
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=k or config.SEARCH_CONFIG['k'],
+            where=where
+        )
+
+        return [self._to_search_results(results, i) for i in range(len(queries))]
+
+    def _hybrid_search(self, queries: List[str], query_embeddings: np.ndarray, k: Optional[int],
+                       where: Optional[Dict[str, Any]]) -> List[List[SearchResult]]:
+        # Векторный поиск и BM25 дают по fusion_candidates кандидатов, списки объединяются
+        # reciprocal rank fusion. Фрагменты, найденные только BM25, дочитываются из коллекции,
+        # а их score считается как косинусное расстояние до запроса - в тех же единицах, что у векторных
+        k = k or config.SEARCH_CONFIG['k']
+        n_candidates = max(k, config.SEARCH_CONFIG['fusion_candidates'])
+        dense = self.collection.query(query_embeddings=query_embeddings, n_results=n_candidates, where=where)
+        allowed_ids = set(self.collection.get(where=where, include=[])['ids']) if where else None
+        lexical = self.lexical
+
+        found = {}
+        for i in range(len(queries)):
+            for id, score, metadata, text in zip(dense['ids'][i], dense['distances'][i],
+                                                 dense['metadatas'][i], dense['documents'][i]):
+                found[(i, id)] = (score, metadata, text)
+
+        rankings = []
+        for i, query in enumerate(queries):
+            lexical_ids = [id for id, _ in lexical.search(query, n_candidates, allowed_ids)]
+            rankings.append(reciprocal_rank_fusion([dense['ids'][i], lexical_ids], config.SEARCH_CONFIG['rrf_k'])[:k])
+
+        missing = sorted({id for i, ranking in enumerate(rankings) for id in ranking if (i, id) not in found})
+        extra = self.collection.get(ids=missing, include=['documents', 'metadatas', 'embeddings']) if missing else None
+        if extra and extra['ids']:
+            vectors = np.asarray(extra['embeddings'], dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            queries_matrix = np.asarray(query_embeddings, dtype=np.float32)
+            queries_matrix = queries_matrix / np.maximum(np.linalg.norm(queries_matrix, axis=1, keepdims=True), 1e-12)
+            similarities = queries_matrix @ vectors.T
+            for j, (id, metadata, text) in enumerate(zip(extra['ids'], extra['metadatas'], extra['documents'])):
+                for i in range(len(queries)):
+                    found.setdefault((i, id), (float(1.0 - similarities[i, j]), metadata, text))
+
+        fused = []
+        for i, ranking in enumerate(rankings):
+            hits = [(id, *found[(i, id)]) for id in ranking if (i, id) in found]
+            fused.append(self._to_search_results({
+                'ids': [[hit[0] for hit in hits]],
+                'distances': [[hit[1] for hit in hits]],
+                'metadatas': [[hit[2] for hit in hits]],
+                'documents': [[hit[3] for hit in hits]]
+            }, 0))
+        return fused
+
+    def _to_search_results(self, results: Dict[str, Any], i: int) -> List[SearchResult]:
         return [
             SearchResult(
                 document_id=id,
@@ -50,22 +576,28 @@ class VectorDatabase:
                 text=text
             )
             for id, score, metadata, text in zip(
-                results['ids'][0],
-                results['distances'][0],
-                results['metadatas'][0],
-                results['documents'][0]
+                results['ids'][i],
+                results['distances'][i],
+                results['metadatas'][i],
+                results['documents'][i]
             )
             if score >= config.SEARCH_CONFIG['score_threshold']
         ]
         
     def clear(self) -> None:
+        self._require_writable()
+        self._lexical_path(self.active_version).unlink(missing_ok=True)
+        self._lexical = None
+        self._lexical_changes = {}
+
+        if self.backend == 'numpy':
+            self.collection.reset()
+            self.collection = self._create_numpy_collection(self.active_version)
+            return
+
         try:
-            self.client.delete_collection("documents")
+            self.client.delete_collection(self.active_version)
         except Exception as e:
             print(f"Ошибка при удалении коллекции: {str(e)}")
         
-        self.collection = self.client.create_collection(
-            name="documents",
-            embedding_function=self.embedding_service,
-            metadata={"hnsw:space": "cosine"}
-        )
\ No newline at end of file
+        self.collection = self._open_collection(self.active_version, create=True)
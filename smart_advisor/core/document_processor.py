@@ -1,32 +1,170 @@
-from typing import List, Optional
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
 from pathlib import Path
 
 from ..models import Document
 from ..config.config import config
+from .chunking import chunk_document
 from .file_loader import FileLoader
 from .database import VectorDatabase
+from .embeddings import EmbeddingService
+from .ingest_journal import IngestJournal, file_fingerprint
+from .pipeline import IngestionPipeline
+
+logger = logging.getLogger(__name__)
+
+# Стадии загрузки в порядке выполнения; load, chunk и embed идут одновременно в разных потоках
+STAGES = ('discover', 'load', 'chunk', 'embed', 'write', 'activate')
+
+
+class JournaledPipeline(IngestionPipeline):
+    # IngestionPipeline, отмечающий в журнале разобранные файлы, записанные батчи
+    # и файлы, все фрагменты которых уже в индексе
+
+    resumable = True
+
+    def __init__(self, vector_db, embedding_service, journal: IngestJournal, run_id: str,
+                 resumed: bool, **kwargs):
+        super().__init__(vector_db, embedding_service, chunk_document, **kwargs)
+        self.journal = journal
+        self.run_id = run_id
+        self.resumed = resumed
+        self._lock = threading.Lock()
+        self._pending: Dict[str, set] = {}
+        self._chunk_ids: Dict[str, List[str]] = {}
+
+    def on_start(self, version: Optional[str]) -> None:
+        if self.resumed:
+            self.journal.resume(self.run_id)
+        else:
+            self.journal.start(self.run_id, version, full_rebuild=version is not None)
+
+    def on_document(self, document: Document, chunks: List[Document], pending: List[Document]) -> None:
+        # Сюда попадают только разобранные документы: при ошибке разбиения chunk_document возвращает None,
+        # и конвейер пропускает документ, так что пустой chunks - это документ без текста, а не сбой
+        source = document.metadata.get('source', document.id)
+        self.journal.parsed(source, len(chunks), len(pending))
+        with self._lock:
+            self._chunk_ids[source] = [chunk.id for chunk in chunks]
+            self._pending[source] = {chunk.id for chunk in pending}
+            if not pending:
+                self._file_done(source)
+
+    def on_written(self, batch: List[Document]) -> None:
+        self.journal.written(doc.id for doc in batch)
+        with self._lock:
+            for doc in batch:
+                source = doc.metadata.get('source')
+                pending = self._pending.get(source)
+                if pending is None:
+                    continue
+                pending.discard(doc.id)
+                if not pending:
+                    self._file_done(source)
+
+    def _file_done(self, source: str) -> None:
+        del self._pending[source]
+        chunk_ids = self._chunk_ids.pop(source)
+        fingerprint = file_fingerprint(source)
+        if fingerprint is not None:
+            self.journal.file_done(source, fingerprint, chunk_ids)
+
 
 class DocumentProcessor:
+    # Оркестратор загрузки: discover -> load -> chunk -> embed -> write -> activate.
+    # Ход загрузки пишется в журнал контрольных точек; прерванный прогон при следующем запуске
+    # продолжается с места остановки: готовые файлы не читаются заново, уже записанные фрагменты
+    # не эмбеддятся, а полная пересборка дозаполняет ту же версию коллекции.
+
+    def __init__(self, documents_dir: Optional[Path] = None, embedding_service: Optional[EmbeddingService] = None,
+                 journal_path: Optional[str] = None, file_loader=None):
+        # file_loader - любой загрузчик с list_files() и iter_documents(exclude=...), по умолчанию FileLoader(documents_dir)
+        self.file_loader = file_loader or FileLoader(documents_dir)
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.database = VectorDatabase(self.embedding_service)
+        self.journal = IngestJournal(journal_path or config.INGEST_CONFIG['journal_path'])
+        self.stage_timings: Dict[str, float] = {}
 
-    def __init__(self):
-        self.file_loader = FileLoader()
-        self.database = VectorDatabase()
-        
     def get_documents(self) -> List[Document]:
 
         return self.file_loader.load_documents()
-        
-    def process_documents(self, documents_dir: Optional[Path] = None) -> None:
 
-        documents = self.get_documents()
-        
+    def _resumable_run(self, full_rebuild: bool, resume: bool) -> Optional[Dict[str, Any]]:
+        run = self.journal.unfinished_run()
+        if run is None:
+            return None
+        if not resume:
+            logger.info(f"Прерванный прогон {run['run_id']} не продолжается, начинаем заново")
+        elif run['full_rebuild'] != full_rebuild:
+            logger.info(f"Прерванный прогон {run['run_id']} был в другом режиме, начинаем заново")
+        elif full_rebuild and run['version'] not in self.database.versions():
+            logger.info(f"Версия {run['version']} прерванного прогона не найдена, начинаем заново")
+            return None
+        else:
+            return run
+        self._discard_run(run)
+        return None
+
+    def _discard_run(self, run: Dict[str, Any]) -> None:
+        # Недостроенная версия отброшенного прогона больше не будет дозаполнена: журнал начнётся заново
+        version = run['version']
+        if run['full_rebuild'] and version != self.database.active_version and version in self.database.versions():
+            self.database.abort_version(version)
+
+    def process_documents(self, documents_dir: Optional[Path] = None, full_rebuild: bool = True,
+                          resume: bool = True) -> Dict[str, Any]:
+        # full_rebuild - сборка новой версии коллекции, иначе синхронизация активной;
+        # resume=False - начать заново, даже если в журнале есть прерванный прогон
+        if documents_dir:
+            self.file_loader = FileLoader(documents_dir)
+
+        start = time.perf_counter()
+        files = self.file_loader.list_files()
+        run = self._resumable_run(full_rebuild, resume)
+        completed: Dict[str, Dict[str, Any]] = {}
+        if run is not None:
+            # Готовым считается файл, не изменившийся с момента записи его фрагментов
+            completed = {path: entry for path, entry in run['files'].items()
+                         if tuple(entry['fingerprint']) == file_fingerprint(path)}
+            logger.info(f"Продолжение прогона {run['run_id']}: готово файлов {len(completed)} из {len(files)}, "
+                        f"записано фрагментов {run['written']}")
+        discover_seconds = time.perf_counter() - start
+
+        run_id = run['run_id'] if run else time.strftime('%Y%m%d-%H%M%S')
+        pipeline = JournaledPipeline(self.database, self.embedding_service, self.journal, run_id,
+                                     resumed=run is not None)
+        known_ids = [chunk_id for entry in completed.values() for chunk_id in entry['chunk_ids']]
+        try:
+            stats = pipeline.run(
+                self.file_loader.iter_documents(exclude=set(completed)),
+                full_rebuild=full_rebuild,
+                resume_version=run['version'] if run and full_rebuild else None,
+                known_ids=known_ids
+            )
+            if run is not None and not full_rebuild:
+                # Фрагменты прерванного прогона записаны, а в лексический индекс не внесены:
+                # поимённо они известны только упавшему процессу, поэтому индекс пересобирается целиком
+                self.database.rebuild_lexical()
+        except BaseException:
+            self.journal.close()
+            logger.error(f"Загрузка прервана, прогон {run_id} будет продолжен при следующем запуске")
+            raise
 
-        self.database.clear()
-        
+        stats['discover_seconds'] = discover_seconds
+        stats['resumed_files'] = len(completed)
+        self.stage_timings = {stage: stats[f'{stage}_seconds'] for stage in STAGES}
+        for stage, seconds in self.stage_timings.items():
+            self.journal.stage(stage, seconds)
+            logger.info(f"Стадия {stage}: {seconds:.2f}с")
+        self.journal.complete(stats.get('version'))
+        logger.info(f"Загрузка завершена за {stats['total_seconds'] + discover_seconds:.1f}с: "
+                    f"документов {stats['documents']} (пропущено готовых {len(completed)}, с ошибкой {stats['failed']}), "
+                    f"фрагментов {stats['chunks']}, записано {stats['written']}")
+        return stats
 
-        self.database.add_documents(documents)
-        
     def search(self, query: str, k: Optional[int] = None) -> List[Document]:
 
         results = self.database.search(query, k)
-        return results 
\ No newline at end of file
+        return results
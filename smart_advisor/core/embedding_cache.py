@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import os
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+KEY_SIZE = 16
+
+
+def normalize_text(text: str) -> str:
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+class EmbeddingCache:
+    # Кэш эмбеддингов на диске: ключ - хэш (модель, нормализованный текст),
+    # значения - строки float32-матрицы, которая читается через memmap.
+    # keys.bin хранит ключи подряд по KEY_SIZE байт, i-й ключ соответствует i-й строке vectors.f32.
+
+    def __init__(self, cache_dir: str, model_name: str, dimension: int):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.cache_dir = Path(cache_dir) / model_name.replace('/', '__').replace(':', '@')
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.keys_path = self.cache_dir / 'keys.bin'
+        self.vectors_path = self.cache_dir / 'vectors.f32'
+
+        self._index: Dict[bytes, int] = {}
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _load(self) -> None:
+        keys = self.keys_path.read_bytes() if self.keys_path.exists() else b''
+        row_size = self.dimension * 4
+        n_keys = len(keys) // KEY_SIZE
+        n_rows = self.vectors_path.stat().st_size // row_size if self.vectors_path.exists() else 0
+        count = min(n_keys, n_rows)
+
+        # После прерванной записи файлы могут разойтись по длине - обрезаем до общей части
+        if len(keys) != count * KEY_SIZE:
+            logger.warning(f"Кэш эмбеддингов {self.cache_dir}: обрезка индекса ключей до {count} записей")
+            with open(self.keys_path, 'wb') as f:
+                f.write(keys[:count * KEY_SIZE])
+        if self.vectors_path.exists() and self.vectors_path.stat().st_size != count * row_size:
+            logger.warning(f"Кэш эмбеддингов {self.cache_dir}: обрезка матрицы до {count} строк")
+            os.truncate(self.vectors_path, count * row_size)
+
+        self._index = {keys[i * KEY_SIZE:(i + 1) * KEY_SIZE]: i for i in range(count)}
+        logger.info(f"Кэш эмбеддингов {self.cache_dir}: {count} записей")
+
+    def _rows(self) -> np.ndarray:
+        if self._matrix is None or self._matrix.shape[0] < len(self._index):
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=np.float32, mode='r',
+                shape=(len(self._index), self.dimension)
+            )
+        return self._matrix
+
+    def key(self, text: str) -> bytes:
+        payload = f"{self.model_name}\x00{normalize_text(text)}".encode('utf-8')
+        return hashlib.blake2b(payload, digest_size=KEY_SIZE).digest()
+
+    def get_many(self, texts: List[str]) -> Tuple[np.ndarray, List[int]]:
+        # Возвращает матрицу с заполненными найденными строками и индексы текстов, которых нет в кэше
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        missing = []
+        found_positions, found_rows = [], []
+
+        for i, text in enumerate(texts):
+            row = self._index.get(self.key(text))
+            if row is None:
+                missing.append(i)
+            else:
+                found_positions.append(i)
+                found_rows.append(row)
+
+        if found_rows:
+            embeddings[found_positions] = self._rows()[found_rows]
+
+        self.hits += len(found_rows)
+        self.misses += len(missing)
+        return embeddings, missing
+
+    def put_many(self, texts: List[str], embeddings: np.ndarray) -> None:
+        with self._lock:
+            new_keys, new_rows = [], []
+            for text, embedding in zip(texts, embeddings):
+                key = self.key(text)
+                if key in self._index:
+                    continue
+                self._index[key] = len(self._index)
+                new_keys.append(key)
+                new_rows.append(embedding)
+
+            if not new_keys:
+                return
+
+            # Сначала дописываются векторы, затем ключи: при сбое лишние строки матрицы обрежутся в _load
+            with open(self.vectors_path, 'ab') as f:
+                f.write(np.asarray(new_rows, dtype=np.float32).tobytes())
+            with open(self.keys_path, 'ab') as f:
+                f.write(b''.join(new_keys))
+
+    def clear(self) -> None:
+        self._matrix = None
+        self._index = {}
+        for path in (self.keys_path, self.vectors_path):
+            if path.exists():
+                path.unlink()
+
+
+class QueryEmbeddingCache:
+    # LRU эмбеддингов запросов в памяти, ключ - нормализованный текст запроса
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(text: str) -> str:
+        return normalize_text(text)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self.key(text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, text: str, embedding: np.ndarray) -> None:
+        if self.max_entries <= 0:
+            return
+        key = self.key(text)
+        with self._lock:
+            self._entries[key] = np.asarray(embedding, dtype=np.float32)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(sys.getsizeof(key) + embedding.nbytes for key, embedding in self._entries.items())
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'memory_bytes': self.memory_bytes()
+        }
@@ -0,0 +1,89 @@
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ..config.config import config
+
+logger = logging.getLogger(__name__)
+
+_worker_model = None
+
+
+def _init_worker(model_name: str, backend: str, num_threads: int) -> None:
+    # Модель загружается один раз на процесс и живёт до закрытия пула
+    global _worker_model
+    from .backends import load_embedding_model
+    _worker_model = load_embedding_model(model_name, backend, 'cpu', num_threads=num_threads)
+
+
+def _encode_shard(texts: List[str], batch_size: int) -> np.ndarray:
+    from .backends import encode_length_sorted
+    return encode_length_sorted(_worker_model, texts, batch_size)
+
+
+class EmbeddingWorkerPool:
+    # Пул процессов для пересборки большого корпуса: тексты режутся на шарды,
+    # шарды раздаются воркерам, результаты отдаются строго в исходном порядке.
+
+    def __init__(self, workers: Optional[int] = None, threads_per_worker: Optional[int] = None,
+                 shard_size: Optional[int] = None):
+        self.workers = workers or config.EMBEDDING_CONFIG['workers']
+        self.threads_per_worker = (threads_per_worker or config.EMBEDDING_CONFIG['threads_per_worker']
+                                   or max(1, (os.cpu_count() or 1) // self.workers))
+        self.shard_size = shard_size or config.EMBEDDING_CONFIG['shard_size']
+
+        logger.info(f"Запуск пула эмбеддингов: {self.workers} процессов по {self.threads_per_worker} потоков")
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(
+                config.EMBEDDING_CONFIG['model_name'],
+                config.EMBEDDING_CONFIG['backend'],
+                self.threads_per_worker
+            )
+        )
+
+    def warmup(self) -> None:
+        # Запускает все процессы и загружает в них модель до первого замера
+        futures = [self._executor.submit(_encode_shard, ["прогрев"], 1) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def encode(self, texts: List[str], batch_size: int) -> Iterator[Tuple[int, np.ndarray]]:
+        # Отдаёт (смещение шарда, эмбеддинги шарда) по порядку; в работе не больше 2 шардов на воркер,
+        # чтобы память не росла вместе с размером корпуса
+        pending = deque()
+        offsets = iter(range(0, len(texts), self.shard_size))
+
+        def submit_next() -> bool:
+            offset = next(offsets, None)
+            if offset is None:
+                return False
+            shard = texts[offset:offset + self.shard_size]
+            pending.append((offset, self._executor.submit(_encode_shard, shard, batch_size)))
+            return True
+
+        for _ in range(self.workers * 2):
+            if not submit_next():
+                break
+
+        while pending:
+            offset, future = pending.popleft()
+            embeddings = future.result()
+            submit_next()
+            yield offset, embeddings
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'EmbeddingWorkerPool':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -1,25 +1,106 @@
-from typing import List
+import logging
+from typing import Any, Dict, List, Optional
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from chromadb.api.types import Documents, EmbeddingFunction
 
 from ..config.config import config
+from .backends import encode_length_sorted
+from .embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from .embedding_workers import EmbeddingWorkerPool
+from .micro_batcher import QueryMicroBatcher
+from .model_registry import get_embedding_cache, get_embedding_model
+
+logger = logging.getLogger(__name__)
 
 class EmbeddingService(EmbeddingFunction):
 
-    
-    def __init__(self):
-        self.model = SentenceTransformer(
-            config.EMBEDDING_CONFIG['model_name'],
-            device=config.EMBEDDING_CONFIG['device'],
-            cache_folder=config.EMBEDDING_CONFIG['cache_folder']
-        )
-        
+
+    def __init__(self, pool: Optional[EmbeddingWorkerPool] = None):
+        # Модель и кэш берутся из общего реестра процесса и загружаются при первом обращении
+        self.model_name = config.EMBEDDING_CONFIG['model_name']
+        self.backend = config.EMBEDDING_CONFIG['backend']
+        self.batch_size = config.EMBEDDING_CONFIG['batch_size']
+        self.pool = pool
+        self._cache = None
+
+        self._batcher = None
+        self.query_cache = QueryEmbeddingCache(config.CACHE_CONFIG['query_cache_size'])
+
+    @property
+    def model(self) -> SentenceTransformer:
+        return get_embedding_model(self.model_name, self.backend)
+
+    @property
+    def cache(self) -> Optional[EmbeddingCache]:
+        if self._cache is None and config.CACHE_CONFIG['embedding_cache_enabled']:
+            # Векторы квантованных бэкендов немного отличаются от fp32, поэтому кэш у каждого бэкенда свой
+            self._cache = get_embedding_cache(
+                f"{self.model_name}:{self.backend}",
+                self.model.get_sentence_embedding_dimension()
+            )
+        return self._cache
+
+    @property
+    def batcher(self) -> Optional[QueryMicroBatcher]:
+        if self._batcher is None and config.EMBEDDING_CONFIG['query_batching']:
+            self._batcher = QueryMicroBatcher(
+                self._encode_queries,
+                config.EMBEDDING_CONFIG['query_batch_window_ms'],
+                config.EMBEDDING_CONFIG['query_batch_max_size']
+            )
+        return self._batcher
+
     def __call__(self, input: Documents) -> List[List[float]]:
+        # Через этот метод Chroma получает эмбеддинги запросов
+        return self.embed_queries(input, use_batcher=True).tolist()
+
+    def embed_queries(self, texts: List[str], use_batcher: bool = False) -> np.ndarray:
+        # Повторные запросы берутся из LRU, остальные считаются одним прогоном модели
+        embeddings = [self.query_cache.get(text) for text in texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
 
-        embeddings = self.model.encode(input, convert_to_numpy=True)
-        return embeddings.tolist()
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            if use_batcher and self.batcher is not None:
+                # Одновременные запросы из разных потоков объединяются в один прогон модели
+                computed = self.batcher.embed(missing_texts)
+            elif len(missing_texts) > self.batch_size:
+                computed = encode_length_sorted(self.model, missing_texts, self.batch_size)
+            else:
+                computed = self._encode_queries(missing_texts)
+            for i, embedding in zip(missing, computed):
+                self.query_cache.put(texts[i], embedding)
+                embeddings[i] = embedding
+
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def _encode_queries(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False)
+
+    def query_cache_stats(self) -> Dict[str, Any]:
+        return self.query_cache.stats()
 
     def generate_single(self, text: str) -> List[float]:
         embedding = self.model.encode(text, convert_to_numpy=True)
-        return embedding.tolist() 
\ No newline at end of file
+        return embedding.tolist()
+
+    def encode_batch(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        if self.cache is None:
+            return self._encode_sorted(texts, batch_size)
+
+        # Модель запускается только для текстов, которых ещё нет в кэше на диске
+        embeddings, missing = self.cache.get_many(texts)
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = self._encode_sorted(missing_texts, batch_size)
+            embeddings[missing] = computed
+            self.cache.put_many(missing_texts, computed)
+
+        logger.info(f"Кэш эмбеддингов: {len(texts) - len(missing)} из {len(texts)} взяты из кэша")
+        return embeddings
+
+    def _encode_sorted(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        if self.pool is not None and len(texts) > self.pool.shard_size:
+            return np.concatenate([embeddings for _, embeddings in self.pool.encode(texts, batch_size or self.batch_size)])
+        return encode_length_sorted(self.model, texts, batch_size or self.batch_size)
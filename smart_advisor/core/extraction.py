@@ -0,0 +1,163 @@
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+from ..config.config import config
+from .extraction_cache import ExtractionCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ExtractedFile:
+    path: str
+    pages: List[str] = field(default_factory=list)
+    title: Optional[str] = None
+    parser: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(page + "\n" for page in self.pages if page)
+
+
+def extract_pages(path: str, start: int = 0, end: Optional[int] = None) -> Tuple[List[str], Optional[str], str]:
+    # Текст страниц [start, end), заголовок из метаданных и имя сработавшего парсера из реестра
+    from ..parsers.registry import get_registry
+
+    pages, metadata, parser = get_registry().extract_pages(path, start, end)
+    return pages, metadata.get('title') or None, parser.name
+
+
+def parser_signature(path: str) -> str:
+    # Имена и версии всех парсеров, которые реестр попробует для файла, - часть ключа кэша
+    from ..parsers.registry import get_registry
+    return ";".join(f"{parser.name}:{parser.version}" for parser in get_registry().parsers_for(path))
+
+
+_extraction_cache: Optional[ExtractionCache] = None
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    global _extraction_cache
+    if not config.CACHE_CONFIG['extraction_cache_enabled']:
+        return None
+    if _extraction_cache is None:
+        _extraction_cache = ExtractionCache(config.CACHE_CONFIG['extraction_cache_dir'])
+    return _extraction_cache
+
+
+def page_count(path: str) -> int:
+    from ..parsers.registry import get_registry
+    return get_registry().page_count(path)
+
+
+def extract_file(path: str) -> ExtractedFile:
+    try:
+        pages, title, parser = extract_pages(path)
+        return ExtractedFile(path=path, pages=pages, title=title, parser=parser)
+    except Exception as e:
+        return ExtractedFile(path=path, error=str(e))
+
+
+def _page_ranges(path: str, pages_per_task: int, large_file_bytes: int) -> List[Tuple[int, Optional[int]]]:
+    # Большие PDF делятся на диапазоны страниц, чтобы один файл не занимал один процесс до конца загрузки
+    if not path.lower().endswith('.pdf') or os.path.getsize(path) < large_file_bytes:
+        return [(0, None)]
+    total = page_count(path)
+    return [(start, start + pages_per_task) for start in range(0, total, pages_per_task)] or [(0, None)]
+
+
+def extract_files_parallel(paths: List[str], workers: Optional[int] = None,
+                           pages_per_task: Optional[int] = None) -> Iterator[ExtractedFile]:
+    # Извлечение текста в пуле процессов. Результаты отдаются в порядке paths,
+    # ошибка в одном файле попадает в его ExtractedFile.error и не прерывает остальные.
+    # В работе не больше 2 файлов на процесс, чтобы извлечённые тексты не копились быстрее, чем их забирают
+    workers = workers or config.FILE_CONFIG['extraction_workers']
+    pages_per_task = pages_per_task or config.FILE_CONFIG['pdf_pages_per_task']
+    large_file_bytes = config.FILE_CONFIG['large_pdf_bytes']
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        pending = deque()
+        remaining = iter(paths)
+
+        def submit_next() -> bool:
+            path = next(remaining, None)
+            if path is None:
+                return False
+            try:
+                ranges = _page_ranges(path, pages_per_task, large_file_bytes)
+                pending.append((path, [executor.submit(extract_pages, path, start, end) for start, end in ranges], None))
+            except Exception as e:
+                pending.append((path, [], str(e)))
+            return True
+
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+
+        while pending:
+            path, futures, error = pending.popleft()
+            result = ExtractedFile(path=path, error=error)
+            for i, future in enumerate(futures):
+                try:
+                    pages, title, parser = future.result()
+                except Exception as e:
+                    result = ExtractedFile(path=path, error=str(e))
+                    for rest in futures[i + 1:]:
+                        rest.cancel()
+                    break
+                result.pages.extend(pages)
+                result.title = result.title or title
+                result.parser = result.parser or parser
+            submit_next()
+            yield result
+
+
+def extract_files(paths: List[str], workers: Optional[int] = None) -> List[ExtractedFile]:
+    return list(iter_extract_files(paths, workers))
+
+
+def iter_extract_files(paths: List[str], workers: Optional[int] = None) -> Iterator[ExtractedFile]:
+    # Текст файлов в порядке paths, по одному: неизменённые файлы берутся из кэша извлечения,
+    # остальные извлекаются (в пуле процессов при workers > 1) и сохраняются в кэш
+    start_time = time.perf_counter()
+    workers = workers or config.FILE_CONFIG['extraction_workers']
+    cache = get_extraction_cache()
+
+    cached, signatures, misses = {}, {}, []
+    for path in paths:
+        signatures[path] = parser_signature(path)
+        hit = cache.get(path, signatures[path]) if cache is not None else None
+        if hit is None:
+            misses.append(path)
+        else:
+            cached[path] = ExtractedFile(path=path, pages=hit['pages'], title=hit['title'], parser=hit['parser'])
+
+    if workers > 1 and len(misses) > 1:
+        extracted = extract_files_parallel(misses, workers)
+    else:
+        extracted = (extract_file(path) for path in misses)
+
+    try:
+        for path in paths:
+            if path in cached:
+                yield cached.pop(path)
+                continue
+            result = next(extracted)
+            if cache is not None and not result.error:
+                try:
+                    cache.put(result.path, signatures[result.path], result.parser, result.pages, result.title)
+                except OSError as e:
+                    logger.warning(f"Не удалось сохранить {result.path} в кэш извлечения: {str(e)}")
+            yield result
+    finally:
+        if cache is not None:
+            cache.save()
+        logger.info(f"Извлечение текста: {len(paths)} файлов, {len(paths) - len(misses)} из кэша, "
+                    f"{len(misses)} извлечено за {time.perf_counter() - start_time:.2f}с")
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    # Кэш извлечённого текста: все тексты лежат подряд в texts.N.bin (utf-8), index.json хранит для файла
+    # размер, mtime, хэш содержимого, подпись парсеров, заголовок, смещение и длины страниц в байтах.
+    # Совпали размер и mtime - текст читается без хэширования; изменился только mtime (копирование,
+    # touch) - сверяется хэш содержимого. Устаревшие тексты вычищаются, когда их больше половины файла:
+    # живые тексты переписываются в texts.N+1.bin, и только потом index.json переключается на него.
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.cache_dir / 'index.json'
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+
+    @property
+    def blob_path(self) -> Path:
+        return self.cache_dir / f'texts.{self.generation}.bin'
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        self.generation = index['generation']
+        entries = index['entries']
+        # Записи за пределами файла текстов (например, оборванная запись) отбрасываются
+        blob_size = self.blob_path.stat().st_size if self.blob_path.exists() else 0
+        return {path: entry for path, entry in entries.items()
+                if entry['offset'] + sum(entry['page_lengths']) <= blob_size}
+
+    def get(self, path: str, parser_signature: str) -> Optional[Dict[str, Any]]:
+        key = os.path.abspath(path)
+        entry = self.entries.get(key)
+        if entry is None or entry['parser'] != parser_signature:
+            self.misses += 1
+            return None
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.misses += 1
+            return None
+        if (stat.st_size, stat.st_mtime_ns) != (entry['size'], entry['mtime_ns']):
+            if stat.st_size != entry['size'] or file_hash(path) != entry['hash']:
+                self.misses += 1
+                return None
+            with self._lock:
+                entry['mtime_ns'] = stat.st_mtime_ns
+                self._dirty = True
+
+        with open(self.blob_path, 'rb') as f:
+            f.seek(entry['offset'])
+            data = f.read(sum(entry['page_lengths']))
+
+        pages, position = [], 0
+        for length in entry['page_lengths']:
+            pages.append(data[position:position + length].decode('utf-8'))
+            position += length
+
+        self.hits += 1
+        return {'pages': pages, 'title': entry['title'], 'parser': entry['parser_name']}
+
+    def put(self, path: str, parser_signature: str, parser_name: Optional[str], pages: List[str],
+            title: Optional[str]) -> None:
+        stat = os.stat(path)
+        content_hash = file_hash(path)
+        encoded = [page.encode('utf-8') for page in pages]
+
+        with self._lock:
+            with open(self.blob_path, 'ab') as f:
+                offset = f.tell()
+                for page in encoded:
+                    f.write(page)
+            self.entries[os.path.abspath(path)] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'hash': content_hash,
+                'parser': parser_signature,
+                'parser_name': parser_name,
+                'title': title,
+                'offset': offset,
+                'page_lengths': [len(page) for page in encoded]
+            }
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            self._compact_if_needed()
+            tmp_path = self.index_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'generation': self.generation, 'entries': self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+
+            for stale in self.cache_dir.glob('texts.*.bin'):
+                if stale != self.blob_path:
+                    stale.unlink(missing_ok=True)
+
+    def _compact_if_needed(self) -> None:
+        blob_size = self.blob_path.stat().st_size if self.blob_path.exists() else 0
+        live = sum(sum(entry['page_lengths']) for entry in self.entries.values())
+        if blob_size < 1 << 20 or live * 2 > blob_size:
+            return
+
+        next_blob = self.cache_dir / f'texts.{self.generation + 1}.bin'
+        with open(self.blob_path, 'rb') as source, open(next_blob, 'wb') as target:
+            for entry in self.entries.values():
+                source.seek(entry['offset'])
+                data = source.read(sum(entry['page_lengths']))
+                entry['offset'] = target.tell()
+                target.write(data)
+        self.generation += 1
+        logger.info(f"Кэш извлечения сжат: {blob_size / 2**20:.1f} -> {live / 2**20:.1f} МБ")
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries = {}
+            self.index_path.unlink(missing_ok=True)
+            for blob in self.cache_dir.glob('texts.*.bin'):
+                blob.unlink(missing_ok=True)
+            self.generation = 0
+            self._dirty = False
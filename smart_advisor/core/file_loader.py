@@ -1,11 +1,11 @@
 import os
 import logging
-from typing import List, Optional
+from typing import Iterator, List, Optional, Set
 from pathlib import Path
-from PyPDF2 import PdfReader
 
 from ..models import Document
 from ..config.config import config
+from .extraction import ExtractedFile, extract_files, iter_extract_files
 
 logger = logging.getLogger(__name__)
 
@@ -15,59 +15,66 @@ class FileLoader:
         self.documents_dir = Path(documents_dir) if documents_dir else config.DOCUMENTS_DIR
         logger.info(f"Инициализация FileLoader с директорией: {self.documents_dir}")
         
-    def load_documents(self) -> List[Document]:
-        documents = []
-        
+    def list_files(self) -> List[Path]:
         if not self.documents_dir.exists():
             logger.warning(f"Директория {self.documents_dir} не существует")
-            return documents
-            
-        logger.info(f"Сканирование директории: {self.documents_dir}")
-        
-        for file_path in self.documents_dir.glob("**/*"):
-            if file_path.is_file():
-                try:
-                    if file_path.suffix.lower() == '.pdf':
-                        logger.info(f"Обработка PDF файла: {file_path}")
-                        doc = self.load_pdf(file_path)
-                    elif file_path.suffix.lower() == '.txt':
-                        logger.info(f"Обработка текстового файла: {file_path}")
-                        doc = self.load_txt(file_path)
-                    else:
-                        continue
-                        
-                    if doc:
-                        documents.append(doc)
-                        logger.info(f"Успешно загружен файл: {file_path}")
-                    else:
-                        logger.warning(f"Не удалось загрузить файл: {file_path}")
-                except Exception as e:
-                    logger.error(f"Ошибка при загрузке файла {file_path}: {e}")
-                    
+            return []
+        return [file_path for file_path in self.documents_dir.glob("**/*")
+                if file_path.is_file() and file_path.suffix.lower() in ('.pdf', '.txt')]
+
+    def load_documents(self, workers: Optional[int] = None) -> List[Document]:
+        documents = list(self.iter_documents(workers))
         logger.info(f"Всего загружено документов: {len(documents)}")
         return documents
-        
+
+    def iter_documents(self, workers: Optional[int] = None,
+                       exclude: Optional[Set[str]] = None) -> Iterator[Document]:
+        # Текст PDF берётся из кэша извлечения, остальные файлы извлекаются по мере чтения
+        # (workers > 1 - в пуле процессов); порядок документов не меняется.
+        # exclude - пути, которые не нужно читать (например, уже записанные в индекс при прерванной сборке)
+        logger.info(f"Сканирование директории: {self.documents_dir}")
+        exclude = exclude or set()
+        files = [file_path for file_path in self.list_files() if str(file_path) not in exclude]
+        pdf_files = [str(file_path) for file_path in files if file_path.suffix.lower() == '.pdf']
+        extracted = iter_extract_files(pdf_files, workers)
+
+        for file_path in files:
+            try:
+                if file_path.suffix.lower() == '.pdf':
+                    logger.info(f"Обработка PDF файла: {file_path}")
+                    doc = self._pdf_document(file_path, next(extracted))
+                else:
+                    logger.info(f"Обработка текстового файла: {file_path}")
+                    doc = self.load_txt(file_path)
+
+                if doc:
+                    logger.info(f"Успешно загружен файл: {file_path}")
+                    yield doc
+                else:
+                    logger.warning(f"Не удалось загрузить файл: {file_path}")
+            except Exception as e:
+                logger.error(f"Ошибка при загрузке файла {file_path}: {e}")
+
     def load_pdf(self, file_path: Path) -> Optional[Document]:
+        logger.info(f"Загрузка PDF файла: {file_path}")
+        return self._pdf_document(file_path, extract_files([str(file_path)], workers=1)[0])
+
+    def _pdf_document(self, file_path: Path, extracted: ExtractedFile) -> Optional[Document]:
         try:
-            logger.info(f"Загрузка PDF файла: {file_path}")
-            reader = PdfReader(str(file_path))
-            logger.info(f"PDF файл загружен, количество страниц: {len(reader.pages)}")
-            
-            text = ""
-            for i, page in enumerate(reader.pages, 1):
-                logger.info(f"Извлечение текста со страницы {i}/{len(reader.pages)}")
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-                else:
+            if extracted.error:
+                raise ValueError(extracted.error)
+            logger.info(f"PDF файл загружен, количество страниц: {len(extracted.pages)}")
+
+            for i, page_text in enumerate(extracted.pages, 1):
+                if not page_text:
                     logger.warning(f"Текст не извлечен со страницы {i}")
-            
+
+            text = extracted.text
             if not text.strip():
                 logger.warning(f"Текст не извлечен из PDF файла: {file_path}")
                 return None
             
-            metadata = reader.metadata
-            title = metadata.get('/Title', file_path.name)
+            title = extracted.title or file_path.name
             
             logger.info(f"Успешно обработан PDF файл: {file_path}")
             logger.info(f"Длина извлеченного текста: {len(text)} символов")
@@ -79,7 +86,7 @@ class FileLoader:
                     'source': str(file_path),
                     'title': title,
                     'type': 'pdf',
-                    'pages': len(reader.pages)
+                    'pages': len(extracted.pages)
                 }
             )
             
@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def file_fingerprint(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class IngestJournal:
+    # Журнал загрузки (JSON Lines, только дозапись): начало прогона и версия коллекции, разобранные файлы,
+    # записанные батчи фрагментов, файлы, все фрагменты которых уже в индексе, время стадий и завершение.
+    # Оборванная при сбое последняя строка пропускается, поэтому журнал всегда читается до последнего
+    # полностью записанного события.
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def _events(self) -> List[Dict[str, Any]]:
+        events = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break
+        except FileNotFoundError:
+            pass
+        return events
+
+    def unfinished_run(self) -> Optional[Dict[str, Any]]:
+        # Состояние прерванного прогона: версия, режим, готовые файлы (отпечаток и id фрагментов)
+        # и число записанных фрагментов; None, если последний прогон завершился или журнала нет
+        run = None
+        for event in self._events():
+            kind = event.get('event')
+            if kind == 'start':
+                run = {'run_id': event['run_id'], 'version': event['version'],
+                       'full_rebuild': event['full_rebuild'], 'files': {}, 'written': 0}
+            elif run is None:
+                continue
+            elif kind == 'file_done':
+                run['files'][event['path']] = {'fingerprint': tuple(event['fingerprint']),
+                                               'chunk_ids': event['chunk_ids']}
+            elif kind == 'written':
+                run['written'] += len(event['chunk_ids'])
+            elif kind == 'complete':
+                run = None
+        return run
+
+    def _append(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def start(self, run_id: str, version: Optional[str], full_rebuild: bool) -> None:
+        # Новый прогон начинает журнал заново: события прошлых прогонов больше не нужны
+        with self._lock:
+            self._close_file()
+            self._file = open(self.path, 'w', encoding='utf-8')
+        self._append({'event': 'start', 'run_id': run_id, 'version': version,
+                      'full_rebuild': full_rebuild, 'time': time.time()})
+
+    def resume(self, run_id: str) -> None:
+        self._append({'event': 'resume', 'run_id': run_id, 'time': time.time()})
+
+    def parsed(self, path: str, chunk_count: int, pending_count: int) -> None:
+        self._append({'event': 'parsed', 'path': path, 'chunks': chunk_count, 'pending': pending_count})
+
+    def written(self, chunk_ids: Iterable[str]) -> None:
+        self._append({'event': 'written', 'chunk_ids': list(chunk_ids)})
+
+    def file_done(self, path: str, fingerprint: Tuple[int, int], chunk_ids: Iterable[str]) -> None:
+        self._append({'event': 'file_done', 'path': path, 'fingerprint': list(fingerprint),
+                      'chunk_ids': list(chunk_ids)})
+
+    def stage(self, name: str, seconds: float) -> None:
+        self._append({'event': 'stage', 'name': name, 'seconds': round(seconds, 3)})
+
+    def complete(self, version: Optional[str]) -> None:
+        self._append({'event': 'complete', 'version': version, 'time': time.time()})
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_file()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
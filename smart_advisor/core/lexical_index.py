@@ -0,0 +1,197 @@
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+class Tokenizer:
+    # Те же стеммер и стоп-слова, что использует QueryProcessor при извлечении ответа
+
+    def __init__(self):
+        import nltk
+        from nltk.corpus import stopwords
+        from nltk.stem import SnowballStemmer
+
+        try:
+            nltk.data.find('corpora/stopwords')
+        except LookupError:
+            nltk.download('stopwords')
+
+        self.stemmer = SnowballStemmer("russian")
+        self.stop_words = set(stopwords.words("russian"))
+        self._stems: Dict[str, str] = {}
+
+    def __call__(self, text: str) -> List[str]:
+        tokens = []
+        for word in TOKEN_PATTERN.findall(text.lower()):
+            if word in self.stop_words:
+                continue
+            stem = self._stems.get(word)
+            if stem is None:
+                stem = self._stems[word] = self.stemmer.stem(word)
+            tokens.append(stem)
+        return tokens
+
+
+class LexicalIndex:
+    # Инвертированный индекс по основам слов со скорингом BM25.
+    # Списки вхождений хранятся двумя плоскими массивами (номера фрагментов uint32, частоты uint16),
+    # словарь - отсортированные термины со смещениями в эти массивы.
+
+    def __init__(self, tokenizer: Optional[Tokenizer] = None, k1: float = 1.5, b: float = 0.75):
+        self.tokenizer = tokenizer or Tokenizer()
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.terms: Dict[str, int] = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.postings = np.empty(0, dtype=np.uint32)
+        self.frequencies = np.empty(0, dtype=np.uint16)
+        self.doc_lengths = np.empty(0, dtype=np.uint32)
+        self.avg_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def build(self, ids: List[str], texts: List[str]) -> 'LexicalIndex':
+        term_postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = []
+        for doc_index, text in enumerate(texts):
+            tokens = self.tokenizer(text)
+            doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                term_postings.setdefault(term, []).append((doc_index, min(frequency, 65535)))
+
+        sorted_terms = sorted(term_postings)
+        lengths = [len(term_postings[term]) for term in sorted_terms]
+        self.offsets = np.zeros(len(sorted_terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+        self.postings = np.fromiter((d for term in sorted_terms for d, _ in term_postings[term]),
+                                    dtype=np.uint32, count=int(self.offsets[-1]))
+        self.frequencies = np.fromiter((f for term in sorted_terms for _, f in term_postings[term]),
+                                       dtype=np.uint16, count=int(self.offsets[-1]))
+        self.terms = {term: i for i, term in enumerate(sorted_terms)}
+        self.ids = list(ids)
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.uint32)
+        self.avg_length = float(self.doc_lengths.mean()) if len(doc_lengths) else 0.0
+        return self
+
+    def update(self, ids: List[str], texts: List[str], removed: Iterable[str] = ()) -> 'LexicalIndex':
+        # Инкрементальное обновление: ids - добавленные или изменённые фрагменты, removed - удалённые.
+        # Токенизируются только новые тексты, вхождения остальных фрагментов переносятся из массивов
+        replaced = set(ids) | set(removed)
+        keep = np.fromiter((id not in replaced for id in self.ids), dtype=bool, count=len(self.ids))
+        positions = np.cumsum(keep) - 1
+        n_kept = int(keep.sum())
+
+        old_terms = list(self.terms)
+        old_term_column = np.repeat(np.arange(len(old_terms), dtype=np.int64), np.diff(self.offsets))
+        kept = keep[self.postings]
+
+        term_postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = []
+        for doc_index, text in enumerate(texts, n_kept):
+            tokens = self.tokenizer(text)
+            doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                term_postings.setdefault(term, []).append((doc_index, min(frequency, 65535)))
+
+        sorted_terms = sorted(set(old_terms) | set(term_postings))
+        term_index = {term: i for i, term in enumerate(sorted_terms)}
+        remap = np.fromiter((term_index[term] for term in old_terms), dtype=np.int64, count=len(old_terms))
+        added = [(term_index[term], d, f) for term, entries in term_postings.items() for d, f in entries]
+        term_column = np.concatenate([remap[old_term_column[kept]],
+                                      np.fromiter((t for t, _, _ in added), dtype=np.int64, count=len(added))])
+        postings = np.concatenate([positions[self.postings[kept]].astype(np.uint32),
+                                   np.fromiter((d for _, d, _ in added), dtype=np.uint32, count=len(added))])
+        frequencies = np.concatenate([self.frequencies[kept],
+                                      np.fromiter((f for _, _, f in added), dtype=np.uint16, count=len(added))])
+
+        # Сортировка вхождений по терминам; термины без вхождений выбрасываются из словаря
+        order = np.argsort(term_column, kind='stable')
+        counts = np.bincount(term_column, minlength=len(sorted_terms))
+        live = counts > 0
+        self.offsets = np.zeros(int(live.sum()) + 1, dtype=np.int64)
+        np.cumsum(counts[live], out=self.offsets[1:])
+        self.postings = postings[order]
+        self.frequencies = frequencies[order]
+        self.terms = {term: i for i, term in enumerate(term for term, alive in zip(sorted_terms, live) if alive)}
+        self.ids = [id for id, k in zip(self.ids, keep) if k] + list(ids)
+        self.doc_lengths = np.concatenate([self.doc_lengths[keep], np.asarray(doc_lengths, dtype=np.uint32)])
+        self.avg_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+        return self
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                ids=np.asarray(self.ids, dtype=object).astype(str),
+                terms=np.asarray(list(self.terms), dtype=str),
+                offsets=self.offsets,
+                postings=self.postings,
+                frequencies=self.frequencies,
+                doc_lengths=self.doc_lengths
+            )
+        tmp_path.replace(path)
+
+    def load(self, path: Path) -> 'LexicalIndex':
+        with np.load(path) as data:
+            return self.from_arrays(data['ids'].tolist(), data['terms'].tolist(), data['offsets'],
+                                    data['postings'], data['frequencies'], data['doc_lengths'])
+
+    def from_arrays(self, ids: List[str], terms: List[str], offsets: np.ndarray, postings: np.ndarray,
+                    frequencies: np.ndarray, doc_lengths: np.ndarray) -> 'LexicalIndex':
+        self.ids = ids
+        self.terms = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.postings = postings
+        self.frequencies = frequencies
+        self.doc_lengths = doc_lengths
+        self.avg_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+        return self
+
+    def search(self, query: str, k: int, allowed_ids: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        if not self.ids:
+            return []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        n_docs = len(self.ids)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_length, 1e-9))
+
+        for term in set(self.tokenizer(query)):
+            term_index = self.terms.get(term)
+            if term_index is None:
+                continue
+            start, end = self.offsets[term_index], self.offsets[term_index + 1]
+            docs = self.postings[start:end]
+            tf = self.frequencies[start:end].astype(np.float32)
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm[docs])
+
+        if allowed_ids is not None:
+            mask = np.fromiter((id in allowed_ids for id in self.ids), dtype=bool, count=n_docs)
+            scores[~mask] = 0
+
+        matched = np.flatnonzero(scores > 0)
+        if not len(matched):
+            return []
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    # Объединение ранжирований: сумма 1 / (k + позиция) по всем спискам
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id in enumerate(ranking, 1):
+            scores[id] = scores.get(id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda id: -scores[id])
@@ -0,0 +1,83 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class QueryMicroBatcher:
+    # Собирает запросы, пришедшие в течение короткого окна (или до max_batch_size),
+    # и считает их эмбеддинги одним прогоном модели; каждый вызывающий получает свой Future.
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], window_ms: float, max_batch_size: int):
+        self._encode_fn = encode_fn
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._queue: 'queue.Queue' = queue.Queue()
+        self.batches = 0
+        self.queries = 0
+
+        self._thread = threading.Thread(target=self._run, name='query-micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def _collect(self, first) -> tuple:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch, stopping = self._collect(item)
+
+            try:
+                embeddings = self._encode_fn([text for text, _ in batch])
+            except Exception as e:
+                logger.error(f"Ошибка при расчёте батча из {len(batch)} запросов: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.queries += len(batch)
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'batches': self.batches,
+            'queries': self.queries,
+            'avg_batch_size': self.queries / self.batches if self.batches else 0.0
+        }
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
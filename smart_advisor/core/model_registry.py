@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from sentence_transformers import CrossEncoder, SentenceTransformer
+from transformers import AutoTokenizer, PreTrainedTokenizerBase
+
+from ..config.config import config
+from .backends import load_embedding_model
+from .embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    # Реестр тяжёлых объектов процесса: каждый ключ загружается один раз, при первом обращении,
+    # и дальше разделяется всеми обёртками (EmbeddingService, BertModel и т.д.)
+
+    def __init__(self):
+        self._objects: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        obj = self._objects.get(key)
+        if obj is not None:
+            return obj
+
+        with self._lock:
+            obj = self._objects.get(key)
+            if obj is None:
+                start = time.perf_counter()
+                obj = loader()
+                self._objects[key] = obj
+                logger.info(f"Реестр моделей: загружено {key} за {time.perf_counter() - start:.1f} с")
+        return obj
+
+    def loaded(self) -> List[Hashable]:
+        return list(self._objects)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._objects.clear()
+
+
+registry = ModelRegistry()
+
+
+def get_embedding_model(model_name: Optional[str] = None, backend: Optional[str] = None,
+                        device: Optional[str] = None) -> SentenceTransformer:
+    model_name = model_name or config.EMBEDDING_CONFIG['model_name']
+    backend = backend or config.EMBEDDING_CONFIG['backend']
+    device = device or config.EMBEDDING_CONFIG['device']
+    return registry.get(
+        ('embedding_model', model_name, backend, device),
+        lambda: load_embedding_model(model_name, backend, device)
+    )
+
+
+def get_tokenizer(model_name: Optional[str] = None) -> PreTrainedTokenizerBase:
+    # Токенизатор модели эмбеддингов без весов: разбиению на фрагменты не нужна сама модель
+    # (при пуле процессов она загружается только в рабочих процессах)
+    model_name = model_name or config.EMBEDDING_CONFIG['model_name']
+    return registry.get(
+        ('tokenizer', model_name),
+        lambda: AutoTokenizer.from_pretrained(model_name, cache_dir=config.EMBEDDING_CONFIG['cache_folder'])
+    )
+
+
+def get_cross_encoder(model_name: Optional[str] = None, device: Optional[str] = None) -> CrossEncoder:
+    model_name = model_name or config.RERANK_CONFIG['model_name']
+    device = device or config.RERANK_CONFIG['device']
+    return registry.get(
+        ('cross_encoder', model_name, device),
+        lambda: CrossEncoder(model_name, max_length=config.RERANK_CONFIG['max_length'], device=device)
+    )
+
+
+def get_embedding_cache(model_key: str, dimension: int) -> EmbeddingCache:
+    # Несколько экземпляров кэша над одними файлами разошлись бы в нумерации строк, поэтому он тоже общий
+    cache_dir = config.CACHE_CONFIG['embedding_cache_dir']
+    return registry.get(
+        ('embedding_cache', cache_dir, model_key),
+        lambda: EmbeddingCache(cache_dir, model_key, dimension)
+    )
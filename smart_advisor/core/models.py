@@ -1,9 +1,10 @@
 from dataclasses import dataclass
 from typing import Dict, Any, Optional, List
 import numpy as np
-from transformers import AutoTokenizer, AutoModel
 import torch
 
+from .model_registry import get_embedding_model
+
 @dataclass
 class Document:
     text: str
@@ -32,13 +33,17 @@ class Document:
         )
 
 class BertModel:
+    # Токенизатор и веса берутся у общей модели из реестра, а не загружаются второй раз
 
-    
-    def __init__(self):
+    @property
+    def tokenizer(self):
+        return get_embedding_model("sberbank-ai/sbert_large_nlu_ru", 'torch', 'cpu').tokenizer
 
-        self.tokenizer = AutoTokenizer.from_pretrained("sberbank-ai/sbert_large_nlu_ru")
-        self.model = AutoModel.from_pretrained("sberbank-ai/sbert_large_nlu_ru")
-        self.model.eval()
+    @property
+    def model(self) -> torch.nn.Module:
+        model = get_embedding_model("sberbank-ai/sbert_large_nlu_ru", 'torch', 'cpu')[0].auto_model
+        model.eval()
+        return model
         
     def get_embedding(self, text: str) -> np.ndarray:
 
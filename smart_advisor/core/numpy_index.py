@@ -0,0 +1,364 @@
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .vector_store import CompactVectorStore, normalize_rows
+
+logger = logging.getLogger(__name__)
+
+
+def matches_where(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    # Подмножество синтаксиса фильтров Chroma: равенство, $eq, $ne, $in, $nin, $and, $or
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if operator == '$eq' and value != operand:
+                    return False
+                if operator == '$ne' and value == operand:
+                    return False
+                if operator == '$in' and value not in operand:
+                    return False
+                if operator == '$nin' and value in operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class NumpyCollection:
+    # Точный поиск в памяти процесса для небольших корпусов: L2-нормализованные эмбеддинги
+    # лежат одной непрерывной float32-матрицей, top-k - одно матричное умножение и argpartition.
+    # Интерфейс повторяет нужную часть chromadb.Collection, чтобы VectorDatabase не зависел от бэкенда.
+    # Новые строки дописываются в конец vectors.f32 и records.log сразу; перезапись records.json,
+    # удаления и пересборка компактного хранилища откладываются до flush() (VectorDatabase вызывает его
+    # при включении версии и пересборке лексического индекса).
+
+    def __init__(self, directory: str, embedding_function: Callable[[List[str]], List[List[float]]],
+                 mmap: bool = False, compression: Optional[str] = None, rerank_factor: int = 4):
+        self.directory = Path(directory)
+        self.embedding_function = embedding_function
+        self.mmap = mmap
+        self.compression = compression
+        self.rerank_factor = rerank_factor
+
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.dimension = 0
+        self._log_size = 0
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self._buffer: Optional[np.ndarray] = None
+        self._positions: Dict[str, int] = {}
+        self._store: Optional[CompactVectorStore] = None
+        # _changed - есть записи, не сведённые в records.json; _vectors_dirty - строки в памяти
+        # разошлись с vectors.f32 (удаления), файл переписывается целиком при flush()
+        self._changed = False
+        self._vectors_dirty = False
+        self._load()
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.directory / 'vectors.f32'
+
+    @property
+    def records_path(self) -> Path:
+        return self.directory / 'records.json'
+
+    @property
+    def log_path(self) -> Path:
+        return self.directory / 'records.log'
+
+    def _load(self) -> None:
+        if not self.records_path.exists():
+            return
+
+        with open(self.records_path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        self.ids = records['ids']
+        self.documents = records['documents']
+        self.metadatas = records['metadatas']
+        self.dimension = records['dimension']
+
+        # Записи после последнего flush(): новый id - новая строка матрицы, известный - замена текста
+        # и метаданных (вектор переписан в файле на месте); оборванная при сбое строка отбрасывается
+        self._log_size = 0
+        positions = {id: i for i, id in enumerate(self.ids)}
+        if self.log_path.exists():
+            with open(self.log_path, 'rb') as f:
+                for line in f:
+                    try:
+                        id, document, metadata = json.loads(line)
+                    except ValueError:
+                        break
+                    self._log_size += len(line)
+                    if id in positions:
+                        self.documents[positions[id]] = document
+                        self.metadatas[positions[id]] = metadata
+                        continue
+                    positions[id] = len(self.ids)
+                    self.ids.append(id)
+                    self.documents.append(document)
+                    self.metadatas.append(metadata)
+            self._changed = True
+
+        # Векторов может оказаться больше записей (сбой между дозаписью векторов и журнала):
+        # лишние строки не читаются и отрезаются перед следующей дозаписью
+        row_bytes = 4 * self.dimension
+        rows = self.vectors_path.stat().st_size // row_bytes if row_bytes and self.vectors_path.exists() else 0
+        count = min(len(self.ids), rows)
+        del self.ids[count:], self.documents[count:], self.metadatas[count:]
+        self._map_vectors()
+
+        self._positions = {id: i for i, id in enumerate(self.ids)}
+        if self.compression:
+            store_dir = self.directory / self.compression
+            self._store = CompactVectorStore(str(store_dir), self.compression, self.rerank_factor)
+            if self._store_count(store_dir) == len(self.ids):
+                self._store.load()
+            else:
+                self._build_store()
+
+        logger.info(f"NumPy-индекс {self.directory}: {len(self.ids)} векторов")
+
+    def _map_vectors(self) -> None:
+        shape = (len(self.ids), self.dimension)
+        self._buffer = None
+        if not self.ids:
+            self.vectors = np.empty(shape, dtype=np.float32)
+        elif self.mmap:
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=shape)
+        else:
+            self.vectors = np.fromfile(self.vectors_path, dtype=np.float32, count=shape[0] * shape[1]).reshape(shape)
+
+    @staticmethod
+    def _store_count(store_dir: Path) -> Optional[int]:
+        try:
+            with open(store_dir / 'store.json', 'r', encoding='utf-8') as f:
+                return json.load(f)['count']
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _build_store(self) -> None:
+        store_dir = self.directory / self.compression
+        shutil.rmtree(store_dir, ignore_errors=True)
+        self._store = CompactVectorStore(str(store_dir), self.compression, self.rerank_factor)
+        if len(self.ids):
+            self._store.build(self.vectors)
+        else:
+            self._store = None
+
+    def _persist(self) -> None:
+        # Полная запись: векторы (если разошлись с файлом), записи и компактное хранилище
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._vectors_dirty or not self.vectors_path.exists():
+            # Сначала пишутся временные файлы, затем подменяют старые
+            tmp_vectors = self.vectors_path.with_suffix('.tmp')
+            np.ascontiguousarray(self.vectors, dtype=np.float32).tofile(tmp_vectors)
+            self.vectors = np.empty((0, 0), dtype=np.float32)
+            self._buffer = None
+            tmp_vectors.replace(self.vectors_path)
+
+        tmp_records = self.records_path.with_suffix('.tmp')
+        with open(tmp_records, 'w', encoding='utf-8') as f:
+            json.dump({
+                'ids': self.ids,
+                'documents': self.documents,
+                'metadatas': self.metadatas,
+                'dimension': self.dimension
+            }, f, ensure_ascii=False)
+        tmp_records.replace(self.records_path)
+        self.log_path.unlink(missing_ok=True)
+        self._log_size = 0
+
+        self._changed = self._vectors_dirty = False
+        if self.mmap or not self.vectors.size:
+            self._map_vectors()
+        if self.compression:
+            self._build_store()
+
+    def flush(self) -> None:
+        if self._changed:
+            self._persist()
+
+    def _in_sync(self) -> bool:
+        # Можно ли писать изменения прямо в vectors.f32: файл есть и совпадает со строками в памяти
+        return not self._vectors_dirty and self.records_path.exists()
+
+    def _append_rows(self, rows: np.ndarray) -> None:
+        count = len(self.vectors)
+        if self.mmap and self._buffer is None and self._in_sync():
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r',
+                                     shape=(count + len(rows), self.dimension))
+            return
+        # Буфер с запасом ёмкости: дозапись без копирования всей матрицы на каждом батче
+        if self._buffer is None or len(self._buffer) < count + len(rows):
+            buffer = np.empty((max(2 * (count + len(rows)), 1024), self.dimension), dtype=np.float32)
+            buffer[:count] = self.vectors
+            self._buffer = buffer
+        self._buffer[count:count + len(rows)] = rows
+        self.vectors = self._buffer[:count + len(rows)]
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def add(self, ids: List[str], embeddings: Sequence, documents: List[str],
+            metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        duplicates = [id for id in ids if id in self._positions]
+        if duplicates:
+            raise ValueError(f"Документы уже есть в индексе: {duplicates[:5]}")
+        self.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def upsert(self, ids: List[str], embeddings: Sequence, documents: List[str],
+               metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        if not ids:
+            return
+        # Как и в Chroma, повтор id в одном вызове - ошибка; проверка до изменения состояния
+        if len(set(ids)) != len(ids):
+            repeated = sorted({id for id in ids if ids.count(id) > 1})
+            raise ValueError(f"Повторяющиеся id в одном вызове: {repeated[:5]}")
+        metadatas = metadatas or [{} for _ in ids]
+        new_vectors = normalize_rows(embeddings)
+        fresh = not len(self.ids)
+        if fresh:
+            # Пустая коллекция: размерность задаёт первый батч, он записывается целиком
+            self.dimension = new_vectors.shape[1]
+            self.vectors = np.empty((0, self.dimension), dtype=np.float32)
+            self._vectors_dirty = True
+        in_sync = self._in_sync()
+
+        appended, records = [], []
+        for id, vector, document, metadata in zip(ids, new_vectors, documents, metadatas):
+            position = self._positions.get(id)
+            records.append(json.dumps([id, document, metadata], ensure_ascii=False))
+            if position is None:
+                self._positions[id] = len(self.ids)
+                self.ids.append(id)
+                self.documents.append(document)
+                self.metadatas.append(metadata)
+                appended.append(vector)
+            else:
+                # Вектор известного id переписывается в файле на месте
+                if in_sync:
+                    with open(self.vectors_path, 'r+b') as f:
+                        f.seek(position * 4 * self.dimension)
+                        f.write(vector.tobytes())
+                if not isinstance(self.vectors, np.memmap):
+                    self.vectors[position] = vector
+                self.documents[position] = document
+                self.metadatas[position] = metadata
+
+        rows = np.asarray(appended, dtype=np.float32).reshape(-1, self.dimension)
+        if in_sync:
+            # Сначала векторы, потом журнал: строка журнала без вектора невозможна
+            if appended:
+                with open(self.vectors_path, 'r+b') as f:
+                    f.truncate((len(self.ids) - len(rows)) * 4 * self.dimension)
+                    f.seek(0, os.SEEK_END)
+                    f.write(rows.tobytes())
+            data = ('\n'.join(records) + '\n').encode('utf-8')
+            with open(self.log_path, 'ab') as f:
+                f.truncate(self._log_size)
+                f.write(data)
+            self._log_size += len(data)
+        if appended:
+            self._append_rows(rows)
+
+        self._changed = True
+        self._store = None
+        if fresh:
+            self._persist()
+
+    def delete(self, ids: List[str]) -> None:
+        removed = {self._positions[id] for id in ids if id in self._positions}
+        if not removed:
+            return
+        keep = [i for i in range(len(self.ids)) if i not in removed]
+        self.vectors = np.asarray(self.vectors)[keep]
+        self._buffer = None
+        self.ids = [self.ids[i] for i in keep]
+        self.documents = [self.documents[i] for i in keep]
+        self.metadatas = [self.metadatas[i] for i in keep]
+        self._positions = {id: i for i, id in enumerate(self.ids)}
+        self._changed = self._vectors_dirty = True
+        self._store = None
+
+    def get(self, ids: Optional[List[str]] = None, limit: Optional[int] = None,
+            include: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        include = include or ['documents', 'metadatas']
+        positions = [self._positions[id] for id in ids if id in self._positions] if ids is not None \
+            else list(range(len(self.ids)))
+        if where:
+            positions = [i for i in positions if matches_where(self.metadatas[i], where)]
+        positions = positions[:limit] if limit else positions
+
+        result = {'ids': [self.ids[i] for i in positions]}
+        if 'documents' in include:
+            result['documents'] = [self.documents[i] for i in positions]
+        if 'metadatas' in include:
+            result['metadatas'] = [self.metadatas[i] for i in positions]
+        if 'embeddings' in include:
+            result['embeddings'] = np.asarray(self.vectors[positions]) if positions else np.empty((0, 0))
+        return result
+
+    def query(self, query_texts: Optional[List[str]] = None, query_embeddings: Optional[Sequence] = None,
+              n_results: int = 10, where: Optional[Dict[str, Any]] = None) -> Dict[str, List[List[Any]]]:
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(query_texts)
+        queries = normalize_rows(query_embeddings)
+
+        # С фильтром скорятся только подходящие строки матрицы
+        candidates = None
+        if where:
+            candidates = np.array([i for i, metadata in enumerate(self.metadatas) if matches_where(metadata, where)],
+                                  dtype=np.int64)
+
+        result = {'ids': [], 'distances': [], 'metadatas': [], 'documents': []}
+        n_candidates = len(self.ids) if candidates is None else len(candidates)
+        if not n_candidates:
+            for key in result:
+                result[key] = [[] for _ in queries]
+            return result
+
+        k = min(n_results, n_candidates)
+        if self._store is not None and candidates is None:
+            hits = [self._store.search(query, k) for query in queries]
+        else:
+            matrix = self.vectors if candidates is None else np.asarray(self.vectors[candidates])
+            scores = queries @ matrix.T
+            hits = []
+            for row in scores:
+                top = np.argpartition(-row, k - 1)[:k]
+                top = top[np.argsort(-row[top])]
+                positions = top if candidates is None else candidates[top]
+                hits.append((positions, row[top]))
+
+        # Расстояния в тех же единицах, что у Chroma с hnsw:space=cosine
+        for positions, similarities in hits:
+            result['ids'].append([self.ids[i] for i in positions])
+            result['distances'].append([float(1.0 - s) for s in similarities])
+            result['metadatas'].append([self.metadatas[i] for i in positions])
+            result['documents'].append([self.documents[i] for i in positions])
+        return result
+
+    def reset(self) -> None:
+        self.ids, self.documents, self.metadatas = [], [], []
+        self._positions = {}
+        self._store = None
+        self._buffer = None
+        self._log_size = 0
+        self._changed = self._vectors_dirty = False
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        if self.directory.exists():
+            shutil.rmtree(self.directory)
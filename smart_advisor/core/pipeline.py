@@ -0,0 +1,220 @@
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from ..config.config import config
+from ..models import Document
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class ThreadedIterator:
+    # Итератор, который вычисляется в фоновом потоке и складывает элементы в ограниченную очередь:
+    # производитель блокируется, когда очередь полна (backpressure), ошибка передаётся потребителю
+
+    def __init__(self, iterable: Iterable, maxsize: int, name: str = "pipeline"):
+        self._queue = queue.Queue(maxsize)
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, args=(iterable,), name=name, daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, iterable: Iterable) -> None:
+        try:
+            for item in iterable:
+                if not self._put((item, None)):
+                    return
+            self._put((_DONE, None))
+        except BaseException as e:
+            self._put((_DONE, e))
+
+    def __iter__(self) -> 'ThreadedIterator':
+        return self
+
+    def __next__(self):
+        if self._finished:
+            raise StopIteration
+        item, error = self._queue.get()
+        if item is _DONE:
+            self._finished = True
+            if error is not None:
+                raise error
+            raise StopIteration
+        return item
+
+    def close(self) -> None:
+        self._stop.set()
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class IngestionPipeline:
+    # Потоковая загрузка: документы -> фрагменты -> эмбеддинги батчами -> запись в индекс.
+    # Три стадии работают одновременно (извлечение текста, разбиение + модель, запись в базу)
+    # и связаны очередями ограниченного размера, поэтому в памяти не больше нескольких батчей,
+    # а записанное до сбоя остаётся в индексе.
+
+    # True - при сбое недостроенная версия не удаляется, чтобы её можно было дозаполнить (resume_version)
+    resumable = False
+
+    def __init__(self, vector_db, embedding_service, chunker: Callable[[Document], Optional[List[Document]]],
+                 batch_size: Optional[int] = None, queue_size: Optional[int] = None):
+        self.vector_db = vector_db
+        self.embedding_service = embedding_service
+        self.chunker = chunker
+        self.batch_size = batch_size or config.INGEST_CONFIG['batch_size']
+        self.queue_size = queue_size or config.INGEST_CONFIG['queue_size']
+        self.stats: Dict[str, Any] = {}
+
+    def _timed(self, stage: str, iterable: Iterable) -> Iterator:
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.stats[f'{stage}_seconds'] += time.perf_counter() - start
+            yield item
+
+    # Точки расширения для журнала (DocumentProcessor): вызываются из потоков стадий
+    def on_start(self, version: Optional[str]) -> None:
+        pass
+
+    def on_document(self, document: Document, chunks: List[Document], pending: List[Document]) -> None:
+        pass
+
+    def on_written(self, batch: List[Document]) -> None:
+        pass
+
+    def _chunks(self, documents: Iterable[Document], indexed: Dict[str, Dict[str, Any]],
+                seen: set, chunked: set) -> Iterator[Document]:
+        for document in documents:
+            self.stats['documents'] += 1
+            start = time.perf_counter()
+            chunks = self.chunker(document)
+            self.stats['chunk_seconds'] += time.perf_counter() - start
+            if chunks is None:
+                # Ошибка разбиения: документ пропускается, его прежние фрагменты остаются в индексе
+                self.stats['failed'] += 1
+                continue
+            chunked.add(document.metadata.get('source', document.id))
+            # Неизменённые фрагменты (тот же id и метаданные) не эмбеддятся повторно
+            pending = [chunk for chunk in chunks if indexed.get(chunk.id) != chunk.metadata]
+            seen.update(chunk.id for chunk in chunks)
+            self.stats['chunks'] += len(chunks)
+            self.on_document(document, chunks, pending)
+            yield from pending
+
+    def _embed(self, batches: Iterable[List[Document]]) -> Iterator[List[Document]]:
+        for batch in batches:
+            start = time.perf_counter()
+            embeddings = self.embedding_service.encode_batch([doc.text for doc in batch])
+            for doc, embedding in zip(batch, embeddings):
+                doc.set_embedding(embedding)
+            self.stats['embed_seconds'] += time.perf_counter() - start
+            self.stats['embedded'] += len(batch)
+            yield batch
+
+    def run(self, documents: Iterable[Document], full_rebuild: bool = False, resume_version: Optional[str] = None,
+            known_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        # full_rebuild - запись в новую версию коллекции, которая включается после проверки;
+        # иначе синхронизация активной версии: новые и изменённые фрагменты записываются по мере готовности,
+        # исчезнувшие удаляются в конце.
+        # resume_version - продолжить заполнение недостроенной версии (уже записанные фрагменты пропускаются),
+        # known_ids - фрагменты документов, которые не передаются в documents, но должны остаться в индексе
+        self.stats = {key: 0 for key in ('documents', 'failed', 'chunks', 'embedded', 'written', 'deleted')}
+        self.stats.update({f'{stage}_seconds': 0.0 for stage in ('load', 'chunk', 'embed', 'write', 'activate')})
+        start_time = time.perf_counter()
+
+        if not full_rebuild:
+            version, collection = None, None
+            indexed = self.vector_db.indexed_metadata()
+        elif resume_version:
+            version, collection = resume_version, self.vector_db.open_version(resume_version)
+            indexed = self.vector_db.indexed_metadata(collection)
+        else:
+            version, collection = self.vector_db.begin_version()
+            indexed = {}
+        seen: set = set(known_ids or ())
+        # Источники, разобранные заново в этом прогоне; для known_ids - по метаданным в индексе
+        chunked: set = {indexed[id].get('source') for id in seen if id in indexed}
+        self.on_start(version)
+
+        loaded = ThreadedIterator(self._timed('load', documents), self.queue_size, name="ingest-load")
+        embedded = ThreadedIterator(
+            self._embed(batched(self._chunks(loaded, indexed, seen, chunked), self.batch_size)),
+            self.queue_size, name="ingest-embed"
+        )
+        try:
+            for batch in embedded:
+                start = time.perf_counter()
+                if full_rebuild:
+                    self.vector_db.add_to_version(collection, batch)
+                else:
+                    self.vector_db.upsert_documents(batch, update_lexical=False)
+                self.stats['write_seconds'] += time.perf_counter() - start
+                self.stats['written'] += len(batch)
+                self.on_written(batch)
+                logger.info(f"Записано {self.stats['written']} фрагментов из {self.stats['documents']} документов")
+        except BaseException:
+            if full_rebuild and not self.resumable:
+                self.vector_db.abort_version(version)
+            raise
+        finally:
+            loaded.close()
+            embedded.close()
+
+        start = time.perf_counter()
+        stale_ids = sorted(set(indexed) - seen)
+        if not seen:
+            # Без документов (например, недоступна директория) индекс не трогаем: иначе синхронизация удалила бы всё
+            logger.warning("Документы не найдены, индекс не изменён")
+            if full_rebuild:
+                self.vector_db.abort_version(version)
+        elif full_rebuild:
+            # В возобновлённой версии могут остаться фрагменты файлов, изменившихся после прерывания
+            if stale_ids:
+                collection.delete(ids=stale_ids)
+            self.stats['deleted'] = len(stale_ids)
+            self.stats['version'] = self.vector_db.commit_version(version, collection, len(seen))
+        else:
+            # Удаляются фрагменты только тех файлов, что разобраны заново или исчезли с диска:
+            # файл, который не удалось загрузить или разбить, сохраняет прежние фрагменты
+            stale_ids = [id for id in stale_ids if self._source_replaced(indexed[id].get('source'), chunked)]
+            self.vector_db.delete_documents(stale_ids, update_lexical=False)
+            self.stats['deleted'] = len(stale_ids)
+            if self.stats['written'] or stale_ids:
+                self.vector_db.update_lexical()
+        self.stats['activate_seconds'] = time.perf_counter() - start
+
+        self.stats['total_seconds'] = time.perf_counter() - start_time
+        return self.stats
+
+    @staticmethod
+    def _source_replaced(source: Optional[str], chunked: set) -> bool:
+        return source is None or source in chunked or not os.path.exists(source)
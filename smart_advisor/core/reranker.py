@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..config.config import config
+from ..models import SearchResult
+from .model_registry import get_cross_encoder
+
+logger = logging.getLogger(__name__)
+
+
+class Reranker:
+    # Переранжирование кандидатов векторного поиска кросс-энкодером: пары (запрос, фрагмент)
+    # скорятся батчами, после каждого батча проверяется бюджет времени на запрос. Ещё до первого батча
+    # число кандидатов ограничивается по средней стоимости пары в прошлых запросах.
+    # Не успевшие получить оценку кандидаты идут после оценённых в исходном порядке.
+
+    def __init__(self, top_n: Optional[int] = None, time_budget_ms: Optional[float] = None,
+                 batch_size: Optional[int] = None):
+        self.top_n = top_n or config.RERANK_CONFIG['top_n']
+        self.time_budget = (time_budget_ms or config.RERANK_CONFIG['time_budget_ms']) / 1000
+        self.batch_size = batch_size or config.RERANK_CONFIG['batch_size']
+
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.top1_changed = 0
+        self.budget_exceeded = 0
+        self.latencies = deque(maxlen=1000)
+        self.pair_seconds: Optional[float] = None  # скользящее среднее времени на одну пару
+
+    @property
+    def model(self):
+        return get_cross_encoder()
+
+    def rerank(self, query: str, results: List[SearchResult]) -> List[SearchResult]:
+        if len(results) < 2:
+            return results[:self.top_n]
+
+        start = time.perf_counter()
+        limit = len(results)
+        if self.pair_seconds:
+            limit = min(limit, max(self.batch_size, int(self.time_budget / self.pair_seconds)))
+        scores: List[float] = []
+        exceeded = limit < len(results)
+        for offset in range(0, limit, self.batch_size):
+            batch_start = time.perf_counter()
+            batch = results[offset:min(offset + self.batch_size, limit)]
+            scores.extend(self.model.predict(
+                [(query, result.text) for result in batch],
+                batch_size=len(batch),
+                show_progress_bar=False
+            ).tolist())
+            batch_time = time.perf_counter() - batch_start
+            self._observe_batch(len(batch), batch_time)
+            # Следующий батч не запускается, если он, судя по предыдущему, не уложится в бюджет
+            if offset + self.batch_size < limit and time.perf_counter() - start + batch_time > self.time_budget:
+                exceeded = True
+                break
+
+        order = list(np.argsort(-np.asarray(scores), kind='stable')) + list(range(len(scores), len(results)))
+        reranked = [results[i] for i in order][:self.top_n]
+
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.queries += 1
+            self.top1_changed += reranked[0].document_id != results[0].document_id
+            self.budget_exceeded += exceeded
+            self.latencies.append(latency)
+        return reranked
+
+    def _observe_batch(self, pairs: int, seconds: float) -> None:
+        with self._lock:
+            cost = seconds / pairs
+            self.pair_seconds = cost if self.pair_seconds is None else 0.8 * self.pair_seconds + 0.2 * cost
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = list(self.latencies)
+            return {
+                'queries': self.queries,
+                'top1_change_rate': self.top1_changed / self.queries if self.queries else 0.0,
+                'budget_exceeded': self.budget_exceeded,
+                'latency_p50_ms': float(np.percentile(latencies, 50) * 1000) if latencies else 0.0,
+                'latency_p99_ms': float(np.percentile(latencies, 99) * 1000) if latencies else 0.0,
+                'pair_cost_ms': (self.pair_seconds or 0.0) * 1000
+            }
@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .lexical_index import LexicalIndex
+from .numpy_index import NumpyCollection
+from .vector_store import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+# Формат снимка: MAGIC, секции массивов (каждая выровнена по ALIGNMENT байт), JSON-заголовок
+# с описанием секций, длина заголовка (uint64) и MAGIC. Заголовок в конце файла позволяет писать
+# секции потоком, а чтение сводится к одному mmap и срезам без копирования.
+MAGIC = b'SADVSNP1'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+
+def _pack_strings(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def write_snapshot(path: Path, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]],
+                   embeddings: np.ndarray, lexical: LexicalIndex, info: Optional[Dict[str, Any]] = None) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    vectors = normalize_rows(embeddings) if len(ids) else np.empty((0, 0), dtype=np.float32)
+
+    # Лексический индекс хранится по номерам строк снимка
+    row_by_id = {id: i for i, id in enumerate(ids)}
+    lexical_rows = np.array([row_by_id[id] for id in lexical.ids], dtype=np.uint32)
+    postings = lexical_rows[lexical.postings] if len(lexical.postings) else lexical.postings
+    doc_lengths = np.zeros(len(ids), dtype=np.uint32)
+    doc_lengths[lexical_rows] = lexical.doc_lengths
+
+    id_offsets, id_blob = _pack_strings(ids)
+    text_offsets, text_blob = _pack_strings(documents)
+    metadata_offsets, metadata_blob = _pack_strings([json.dumps(m, ensure_ascii=False) for m in metadatas])
+    term_offsets, term_blob = _pack_strings(list(lexical.terms))
+
+    sections = {
+        'vectors': vectors,
+        'id_offsets': id_offsets, 'ids': id_blob,
+        'text_offsets': text_offsets, 'texts': text_blob,
+        'metadata_offsets': metadata_offsets, 'metadatas': metadata_blob,
+        'term_offsets': term_offsets, 'terms': term_blob,
+        'posting_offsets': np.asarray(lexical.offsets, dtype=np.int64),
+        'postings': np.asarray(postings, dtype=np.uint32),
+        'frequencies': np.asarray(lexical.frequencies, dtype=np.uint16),
+        'doc_lengths': doc_lengths
+    }
+
+    header = {
+        'format': FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'count': len(ids),
+        'dimension': int(vectors.shape[1]) if vectors.size else 0,
+        'info': info or {},
+        'sections': {}
+    }
+
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        for name, array in sections.items():
+            f.write(b'\0' * (-f.tell() % ALIGNMENT))
+            array = np.ascontiguousarray(array)
+            header['sections'][name] = {'offset': f.tell(), 'dtype': array.dtype.str, 'shape': list(array.shape)}
+            f.write(array.tobytes())
+        encoded_header = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        f.write(encoded_header)
+        f.write(struct.pack('<Q', len(encoded_header)))
+        f.write(MAGIC)
+    os.replace(tmp_path, path)
+
+    logger.info(f"Снимок индекса {path}: {len(ids)} фрагментов, {path.stat().st_size / 2**20:.1f} МБ")
+    return path
+
+
+def read_snapshot(path: Path) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    # Файл отображается в память только для чтения, секции - представления без копирования
+    raw = np.memmap(path, dtype=np.uint8, mode='r')
+    if bytes(raw[:len(MAGIC)]) != MAGIC or bytes(raw[-len(MAGIC):]) != MAGIC:
+        raise ValueError(f"{path} не является снимком индекса")
+
+    header_end = len(raw) - len(MAGIC) - 8
+    header_length = struct.unpack('<Q', bytes(raw[header_end:header_end + 8]))[0]
+    header = json.loads(bytes(raw[header_end - header_length:header_end]).decode('utf-8'))
+    if header['format'] != FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия снимка: {header['format']}")
+
+    sections = {}
+    for name, section in header['sections'].items():
+        dtype = np.dtype(section['dtype'])
+        size = int(np.prod(section['shape'])) * dtype.itemsize
+        start = section['offset']
+        sections[name] = raw[start:start + size].view(dtype).reshape(section['shape'])
+    return header, sections
+
+
+class _PackedStrings(Sequence):
+    # Строки декодируются из отображённого файла при обращении и запоминаются
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray, decode: Callable[[str], Any] = None):
+        self.offsets = offsets
+        self.blob = blob
+        self.decode = decode
+        self._decoded: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        value = self._decoded.get(i)
+        if value is None:
+            value = bytes(self.blob[int(self.offsets[i]):int(self.offsets[i + 1])]).decode('utf-8')
+            if self.decode is not None:
+                value = self.decode(value)
+            self._decoded[i] = value
+        return value
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class SnapshotCollection(NumpyCollection):
+    # Коллекция только для чтения поверх снимка: векторы и тексты не загружаются, а отображаются в память,
+    # поэтому новый процесс готов к поиску сразу после открытия файла (не считая загрузки модели)
+
+    def __init__(self, path: str, embedding_function: Callable[[List[str]], List[List[float]]]):
+        self.path = Path(path)
+        self.header: Dict[str, Any] = {}
+        self.sections: Dict[str, np.ndarray] = {}
+        self._stat: Optional[Tuple[int, int]] = None
+        super().__init__(str(self.path.parent), embedding_function)
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            logger.warning(f"Снимок индекса {self.path} не найден")
+            return
+
+        self._stat = self._file_stat()
+        self.header, self.sections = read_snapshot(self.path)
+        self.ids = list(_PackedStrings(self.sections['id_offsets'], self.sections['ids']))
+        self.documents = _PackedStrings(self.sections['text_offsets'], self.sections['texts'])
+        self.metadatas = _PackedStrings(self.sections['metadata_offsets'], self.sections['metadatas'], json.loads)
+        self.vectors = self.sections['vectors']
+        self._positions = {id: i for i, id in enumerate(self.ids)}
+        logger.info(f"Снимок индекса {self.path}: {len(self.ids)} фрагментов от {self.header['created_at']}")
+
+    def _file_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self) -> bool:
+        # Новый снимок, скопированный на место старого, подхватывается без перезапуска
+        return self._file_stat() != self._stat
+
+    def lexical_index(self, index: LexicalIndex) -> LexicalIndex:
+        if not self.sections:
+            return index
+        terms = _PackedStrings(self.sections['term_offsets'], self.sections['terms'])
+        return index.from_arrays(
+            self.ids, list(terms),
+            self.sections['posting_offsets'],
+            self.sections['postings'],
+            self.sections['frequencies'],
+            self.sections['doc_lengths']
+        )
+
+    def _read_only(self, *args, **kwargs) -> None:
+        raise ValueError(f"Снимок индекса {self.path} доступен только для чтения")
+
+    add = upsert = delete = reset = _persist = _read_only
@@ -0,0 +1,70 @@
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Optional
+
+
+def _scholarship_phrase(stem: str) -> str:
+    # Прилагательное перед словом "стипендия" с не более чем двумя словами между ними:
+    # "повышенной государственной академической стипендии", но не "академический отпуск" или "специальность"
+    return rf'\b{stem}\w*(?:\s+\w+){{0,2}}?\s+стипенди'
+
+
+# Тип стипендии -> (флаг в метаданных, фразы для поиска в тексте фрагмента).
+# Названия типов совпадают с QueryProcessor.advisor_types, чтобы фильтр строился по результату _detect_advisor_type.
+SCHOLARSHIP_TAGS = {
+    'академическая': ('sch_academic', [_scholarship_phrase('академическ')]),
+    'повышенная': ('sch_increased', [_scholarship_phrase('повышенн')]),
+    'социальная': ('sch_social', [_scholarship_phrase('социальн')]),
+    'специальная': ('sch_special', [
+        _scholarship_phrase('специальн'),
+        _scholarship_phrase('именн'),
+        _scholarship_phrase('президентск'),
+        r'\bстипенди\w*\s+(?:президента|правительства)\b',
+    ]),
+}
+SCHOLARSHIP_PATTERNS = {scholarship_type: re.compile('|'.join(patterns))
+                        for scholarship_type, (_, patterns) in SCHOLARSHIP_TAGS.items()}
+
+DOCUMENT_TYPES = {
+    'положение': ['положени'],
+    'приказ': ['приказ'],
+    'постановление': ['постановлени'],
+    'правила': ['правил'],
+    'порядок': ['порядок', 'порядке'],
+    'регламент': ['регламент'],
+    'распоряжение': ['распоряжени'],
+}
+
+
+def detect_document_type(metadata: Dict[str, Any], text: str) -> str:
+    # Тип документа ищется в названии и начале текста исходного документа
+    haystack = f"{metadata.get('title') or ''} {os.path.basename(str(metadata.get('source', '')))} {text[:300]}".lower()
+    for document_type, stems in DOCUMENT_TYPES.items():
+        if any(stem in haystack for stem in stems):
+            return document_type
+    return 'другое'
+
+
+def tag_chunk(text: str, metadata: Dict[str, Any], document_type: Optional[str] = None) -> Dict[str, Any]:
+    # Теги фрагмента для фильтрации поиска: флаг на каждый упомянутый тип стипендии,
+    # преобладающий тип, тип документа и имя файла-источника. Значения - скаляры, как требует Chroma.
+    lowered = text.lower()
+    counts = Counter()
+    tags: Dict[str, Any] = {}
+
+    for scholarship_type, (flag, _) in SCHOLARSHIP_TAGS.items():
+        mentions = len(SCHOLARSHIP_PATTERNS[scholarship_type].findall(lowered))
+        tags[flag] = mentions > 0
+        if mentions:
+            counts[scholarship_type] = mentions
+
+    tags['scholarship_type'] = counts.most_common(1)[0][0] if counts else 'общая'
+    tags['document_type'] = document_type or detect_document_type(metadata, text)
+    tags['source_name'] = os.path.basename(str(metadata.get('source', '')))
+    return tags
+
+
+def scholarship_filter(scholarship_type: str) -> Optional[Dict[str, Any]]:
+    tag = SCHOLARSHIP_TAGS.get(scholarship_type)
+    return {tag[0]: True} if tag else None
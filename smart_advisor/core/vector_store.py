@@ -0,0 +1,114 @@
+import json
+import logging
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CODE_TYPES = ('int8', 'float16')
+SCORE_BLOCK = 65536
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class CompactVectorStore:
+    # Компактное хранилище векторов: в памяти лежат int8/float16-коды для первого прохода,
+    # точные float32-векторы читаются из memmap только для лучших кандидатов.
+    # Векторы нормализуются, поэтому скалярное произведение = косинусное сходство.
+
+    def __init__(self, directory: str, code_type: str = 'int8', rerank_factor: int = 4):
+        if code_type not in CODE_TYPES:
+            raise ValueError(f"Неизвестный тип кодов: {code_type}. Доступны: {', '.join(CODE_TYPES)}")
+        self.directory = Path(directory)
+        self.code_type = code_type
+        self.rerank_factor = rerank_factor
+        self.dimension = 0
+        self.codes: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self.vectors: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return 0 if self.codes is None else self.codes.shape[0]
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.directory / 'vectors.f32'
+
+    def build(self, embeddings: np.ndarray) -> 'CompactVectorStore':
+        vectors = normalize_rows(embeddings)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dimension = vectors.shape[1]
+
+        vectors.tofile(self.vectors_path)
+        codes, scales = self.encode(vectors)
+        np.save(self.directory / 'codes.npy', codes)
+        if scales is not None:
+            np.save(self.directory / 'scales.npy', scales)
+        with open(self.directory / 'store.json', 'w', encoding='utf-8') as f:
+            json.dump({'code_type': self.code_type, 'dimension': self.dimension, 'count': len(vectors)}, f)
+
+        logger.info(f"Компактное хранилище {self.directory}: {len(vectors)} векторов, коды {self.code_type}")
+        return self.load()
+
+    def load(self) -> 'CompactVectorStore':
+        with open(self.directory / 'store.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.code_type = meta['code_type']
+        self.dimension = meta['dimension']
+        self.codes = np.load(self.directory / 'codes.npy')
+        scales_path = self.directory / 'scales.npy'
+        self.scales = np.load(scales_path) if scales_path.exists() else None
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(meta['count'], self.dimension)) \
+            if meta['count'] else np.empty((0, self.dimension), dtype=np.float32)
+        return self
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.code_type == 'float16':
+            return vectors.astype(np.float16), None
+
+        # Симметричное int8-квантование с масштабом на каждый вектор
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        # Скоринг по кодам блоками, чтобы не разворачивать всю матрицу в float32
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), SCORE_BLOCK):
+            block = self.codes[start:start + SCORE_BLOCK].astype(np.float32)
+            scores[start:start + SCORE_BLOCK] = block @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Возвращает (номера строк, косинусное сходство) лучших k векторов, по убыванию сходства
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = normalize_rows(np.asarray(query).reshape(1, -1))[0]
+        k = min(k, len(self))
+        n_candidates = min(len(self), k * self.rerank_factor)
+
+        scores = self.approximate_scores(query)
+        candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+        candidates.sort()
+
+        exact = np.asarray(self.vectors[candidates]) @ query
+        top = np.argsort(-exact)[:k]
+        return candidates[top], exact[top]
+
+    def memory_per_vector(self) -> float:
+        # Байт на вектор в памяти (коды + масштабы); точные векторы остаются на диске
+        if not len(self):
+            return 0.0
+        total = self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+        return total / len(self)
@@ -1,12 +1,16 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
 class BaseParser(ABC):
+    # Имя и версия парсера входят в ключ кэша извлечённого текста: при смене логики версия увеличивается
+    name = "base"
+    version = 1
+
     def __init__(self):
         self._clean_regex = re.compile(r'\s+')
         self._config = {}
@@ -27,4 +31,15 @@ class BaseParser(ABC):
         if not content or len(content) < 50:
             logger.warning(f"Content too short: {len(content)} chars")
             return False
-        return True
\ No newline at end of file
+        return True
+
+    def page_count(self, file_path: Path) -> int:
+        return 1
+
+    def extract_pages(self, file_path: Path, start: int = 0, end: Optional[int] = None) -> Tuple[List[str], Dict]:
+        # Текст по страницам без схлопывания переносов строк (абзацы нужны для разбиения на фрагменты)
+        # и метаданные файла. По умолчанию весь файл - одна страница
+        parsed = self.parse(file_path)
+        if not parsed:
+            return [], {}
+        return [parsed["content"]], parsed["metadata"]
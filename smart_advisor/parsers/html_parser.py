@@ -1,6 +1,6 @@
 from bs4 import BeautifulSoup
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from smart_advisor.parsers.base import BaseParser
 from smart_advisor.config import settings
 import logging
@@ -9,6 +9,9 @@ logger = logging.getLogger(__name__)
 
 
 class HTMLParser(BaseParser):
+    name = "html"
+    version = 1
+
     def __init__(self):
         super().__init__()
         self._config = settings.get_parser_config("html")
@@ -38,6 +41,18 @@ class HTMLParser(BaseParser):
             logger.error(f"Failed to parse HTML {file_path}: {str(e)}")
             return None
 
+    def extract_pages(self, file_path: Path, start: int = 0, end: Optional[int] = None) -> Tuple[List[str], Dict]:
+        # Текст абзацев и заголовков, разделённых пустой строкой; без них - весь видимый текст
+        with open(file_path, 'r', encoding='utf-8') as f:
+            soup = BeautifulSoup(f.read(), 'html.parser')
+
+        for element in soup(self._config.get("exclude_tags", [])):
+            element.decompose()
+
+        blocks = [self.clean_text(tag.get_text()) for tag in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])]
+        text = "\n\n".join(block for block in blocks if block) or soup.get_text("\n")
+        return [text], {"title": soup.title.string if soup.title and soup.title.string else ""}
+
     @staticmethod
     def is_supported(file_path: Path) -> bool:
         return file_path.suffix.lower() in ('.html', '.htm')
\ No newline at end of file
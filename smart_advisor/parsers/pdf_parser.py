@@ -1,6 +1,6 @@
 import fitz  # PyMuPDF
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from smart_advisor.parsers.base import BaseParser
 from smart_advisor.config import settings
 import logging
@@ -9,6 +9,9 @@ logger = logging.getLogger(__name__)
 
 
 class PDFParser(BaseParser):
+    name = "pymupdf"
+    version = 1
+
     def __init__(self):
         super().__init__()
         self._config = settings.get_parser_config("pdf")
@@ -48,6 +51,17 @@ class PDFParser(BaseParser):
             if 'doc' in locals():
                 doc.close()
 
+    def page_count(self, file_path: Path) -> int:
+        with fitz.open(file_path) as doc:
+            return len(doc)
+
+    def extract_pages(self, file_path: Path, start: int = 0, end: Optional[int] = None) -> Tuple[List[str], Dict]:
+        with fitz.open(file_path) as doc:
+            end = len(doc) if end is None else min(end, len(doc))
+            pages = [doc[i].get_text("text") for i in range(start, end)]
+            meta = {"title": doc.metadata.get("title", "") if doc.metadata else "", "pages": len(doc)}
+        return pages, meta
+
     @staticmethod
     def is_supported(file_path: Path) -> bool:
         return file_path.suffix.lower() == '.pdf'
\ No newline at end of file
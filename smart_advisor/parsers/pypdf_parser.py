@@ -0,0 +1,49 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from PyPDF2 import PdfReader
+from smart_advisor.parsers.base import BaseParser
+from smart_advisor.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PyPDFParser(BaseParser):
+    # Запасной парсер PDF на PyPDF2: медленнее PyMuPDF, но без нативных зависимостей
+    name = "pypdf2"
+    version = 1
+
+    def __init__(self):
+        super().__init__()
+        self._config = settings.get_parser_config("pdf")
+
+    def parse(self, file_path: Path) -> Optional[Dict]:
+        try:
+            pages, meta = self.extract_pages(file_path)
+            text = self.clean_text("\n".join(pages))
+
+            if not self.validate_content(text):
+                return None
+
+            meta.update({"source": str(file_path), "type": "pdf"})
+            return {
+                "content": text[:settings.MAX_TEXT_LENGTH],
+                "metadata": meta
+            }
+        except Exception as e:
+            logger.error(f"Failed to parse PDF {file_path}: {str(e)}")
+            return None
+
+    def page_count(self, file_path: Path) -> int:
+        return len(PdfReader(str(file_path)).pages)
+
+    def extract_pages(self, file_path: Path, start: int = 0, end: Optional[int] = None) -> Tuple[List[str], Dict]:
+        reader = PdfReader(str(file_path))
+        end = len(reader.pages) if end is None else min(end, len(reader.pages))
+        pages = [reader.pages[i].extract_text() or "" for i in range(start, end)]
+        title = reader.metadata.get('/Title', "") if reader.metadata else ""
+        return pages, {"title": title or "", "pages": len(reader.pages)}
+
+    @staticmethod
+    def is_supported(file_path: Path) -> bool:
+        return file_path.suffix.lower() == '.pdf'
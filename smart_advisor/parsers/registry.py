@@ -0,0 +1,94 @@
+import importlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from smart_advisor.parsers.base import BaseParser
+
+logger = logging.getLogger(__name__)
+
+# Парсеры по умолчанию в порядке приоритета: для PDF сначала PyMuPDF, PyPDF2 - запасной вариант.
+# Модули импортируются лениво, чтобы отсутствие одной из библиотек не ломало остальные
+DEFAULT_PARSERS = [
+    ('smart_advisor.parsers.pdf_parser', 'PDFParser'),
+    ('smart_advisor.parsers.pypdf_parser', 'PyPDFParser'),
+    ('smart_advisor.parsers.html_parser', 'HTMLParser'),
+]
+
+
+class ParserRegistry:
+
+    def __init__(self):
+        self._parsers: List[BaseParser] = []
+
+    def register(self, parser: BaseParser) -> None:
+        self._parsers.append(parser)
+
+    def parsers(self) -> List[BaseParser]:
+        return list(self._parsers)
+
+    def parsers_for(self, file_path: Path) -> List[BaseParser]:
+        return [parser for parser in self._parsers if parser.is_supported(Path(file_path))]
+
+    def get(self, name: str) -> Optional[BaseParser]:
+        return next((parser for parser in self._parsers if parser.name == name), None)
+
+    def is_supported(self, file_path: Path) -> bool:
+        return bool(self.parsers_for(file_path))
+
+    def page_count(self, file_path: Path) -> int:
+        return self._first_successful(file_path, lambda parser: parser.page_count(Path(file_path)))[0]
+
+    def extract_pages(self, file_path: Path, start: int = 0,
+                      end: Optional[int] = None) -> Tuple[List[str], Dict, BaseParser]:
+        # Первый подходящий парсер, давший текст; при ошибке или пустом результате - следующий
+        (pages, metadata), parser = self._first_successful(
+            file_path,
+            lambda parser: parser.extract_pages(Path(file_path), start, end),
+            lambda result: any(page.strip() for page in result[0])
+        )
+        return pages, metadata, parser
+
+    def _first_successful(self, file_path, action, accept=None):
+        parsers = self.parsers_for(file_path)
+        if not parsers:
+            raise ValueError(f"Нет парсера для файла {file_path}")
+
+        fallback, last_error = None, None
+        for parser in parsers:
+            try:
+                result = action(parser)
+            except Exception as e:
+                logger.warning(f"Парсер {parser.name} не справился с {file_path}: {str(e)}")
+                last_error = e
+                continue
+            if accept is None or accept(result):
+                return result, parser
+            logger.warning(f"Парсер {parser.name} не извлёк текст из {file_path}")
+            fallback = fallback or (result, parser)
+
+        if fallback is None:
+            raise last_error
+        return fallback
+
+
+def create_default_registry() -> ParserRegistry:
+    registry = ParserRegistry()
+    for module_name, class_name in DEFAULT_PARSERS:
+        try:
+            parser_class = getattr(importlib.import_module(module_name), class_name)
+        except ImportError as e:
+            logger.warning(f"Парсер {class_name} недоступен: {str(e)}")
+            continue
+        registry.register(parser_class())
+    return registry
+
+
+_default_registry: Optional[ParserRegistry] = None
+
+
+def get_registry() -> ParserRegistry:
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = create_default_registry()
+    return _default_registry
@@ -3,16 +3,13 @@ import numpy as np
 from sentence_transformers import SentenceTransformer
 from chromadb.api.types import Documents, EmbeddingFunction
 
-from ..config.config import config
+from ..core.model_registry import get_embedding_model
 
 class EmbeddingService(EmbeddingFunction):
-    
-    def __init__(self):
-        self.model = SentenceTransformer(
-            "sberbank-ai/sbert_large_nlu_ru",
-            device='cpu',
-            cache_folder=str(config.MODELS_DIR)
-        )
+
+    @property
+    def model(self) -> SentenceTransformer:
+        return get_embedding_model("sberbank-ai/sbert_large_nlu_ru", 'torch', 'cpu')
         
     def __call__(self, input: Documents) -> List[List[float]]:
         embeddings = self.model.encode(input, convert_to_numpy=True)
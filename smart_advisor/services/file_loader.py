@@ -1,10 +1,9 @@
 import os
 import logging
-from typing import List, Optional
-from bs4 import BeautifulSoup
-from PyPDF2 import PdfReader
+from typing import Iterator, List, Optional, Set
 from ..models import Document
 from ..config import settings
+from ..core.extraction import ExtractedFile, extract_files, iter_extract_files
 
 logger = logging.getLogger(__name__)
 
@@ -16,20 +15,37 @@ class FileLoader:
         self.pdf_dir = settings.PDF_DIR
         self.supported_extensions = {'.html', '.pdf'}
         
-    def load_documents(self) -> List[Document]:
-        documents = []
-        
+    def load_documents(self, workers: Optional[int] = None) -> List[Document]:
+        documents = list(self.iter_documents(workers))
+        logger.info(f"Total documents loaded: {len(documents)}")
+        return documents
+
+    def list_files(self) -> List[str]:
+        files = []
+        for directory, extension in ((self.html_dir, '.html'), (self.pdf_dir, '.pdf')):
+            if os.path.exists(directory):
+                files.extend(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(extension))
+        return files
+
+    def iter_documents(self, workers: Optional[int] = None,
+                       exclude: Optional[Set[str]] = None) -> Iterator[Document]:
+        # Документы по одному, по мере извлечения: неизменённые файлы берутся из кэша извлечения,
+        # остальные извлекаются (workers > 1 - в пуле процессов); порядок файлов сохраняется.
+        # exclude - пути, которые не нужно читать (уже записанные в индекс при прерванной сборке)
+        exclude = exclude or set()
         if os.path.exists(self.html_dir):
             logger.info(f"Scanning HTML directory: {self.html_dir}")
-            html_files = [f for f in os.listdir(self.html_dir) if f.endswith('.html')]
+            html_files = [f for f in os.listdir(self.html_dir)
+                          if f.endswith('.html') and os.path.join(self.html_dir, f) not in exclude]
             logger.info(f"Found {len(html_files)} HTML files")
+            paths = [os.path.join(self.html_dir, filename) for filename in html_files]
             
-            for filename in html_files:
+            for filename, extracted in zip(html_files, iter_extract_files(paths, workers)):
                 file_path = os.path.join(self.html_dir, filename)
                 logger.info(f"Processing HTML file: {filename}")
-                doc = self.load_html(file_path)
+                doc = self.load_html(file_path, extracted)
                 if doc:
-                    documents.append(doc)
+                    yield doc
                     logger.info(f"Successfully loaded HTML file: {filename}")
                 else:
                     logger.warning(f"Failed to load HTML file: {filename}")
@@ -38,38 +54,35 @@ class FileLoader:
         
         if os.path.exists(self.pdf_dir):
             logger.info(f"Scanning PDF directory: {self.pdf_dir}")
-            pdf_files = [f for f in os.listdir(self.pdf_dir) if f.endswith('.pdf')]
+            pdf_files = [f for f in os.listdir(self.pdf_dir)
+                         if f.endswith('.pdf') and os.path.join(self.pdf_dir, f) not in exclude]
             logger.info(f"Found {len(pdf_files)} PDF files")
+
+            paths = [os.path.join(self.pdf_dir, filename) for filename in pdf_files]
             
-            for filename in pdf_files:
+            for filename, extracted in zip(pdf_files, iter_extract_files(paths, workers)):
                 file_path = os.path.join(self.pdf_dir, filename)
                 logger.info(f"Processing PDF file: {filename}")
-                doc = self.load_pdf(file_path)
+                doc = self._pdf_document(file_path, extracted)
                 if doc:
-                    documents.append(doc)
+                    yield doc
                     logger.info(f"Successfully loaded PDF file: {filename}")
                 else:
                     logger.warning(f"Failed to load PDF file: {filename}")
         else:
             logger.warning(f"PDF directory does not exist: {self.pdf_dir}")
-        
-        logger.info(f"Total documents loaded: {len(documents)}")
-        return documents
     
-    def load_html(self, file_path: str) -> Optional[Document]:
+    def load_html(self, file_path: str, extracted: Optional[ExtractedFile] = None) -> Optional[Document]:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            extracted = extracted or extract_files([file_path], workers=1)[0]
+            if extracted.error:
+                raise ValueError(extracted.error)
             
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            title = soup.title.string if soup.title else os.path.basename(file_path)
-            
-            text = ' '.join([p.get_text() for p in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])])
+            title = extracted.title or os.path.basename(file_path)
             
             return Document(
                 id=os.path.basename(file_path),
-                text=text,
+                text=extracted.text,
                 metadata={
                     'source': file_path,
                     'title': title,
@@ -82,26 +95,25 @@ class FileLoader:
             return None
             
     def load_pdf(self, file_path: str) -> Optional[Document]:
+        logger.info(f"Loading PDF file: {file_path}")
+        return self._pdf_document(file_path, extract_files([file_path], workers=1)[0])
+
+    def _pdf_document(self, file_path: str, extracted: ExtractedFile) -> Optional[Document]:
         try:
-            logger.info(f"Loading PDF file: {file_path}")
-            reader = PdfReader(file_path)
-            logger.info(f"PDF file loaded, number of pages: {len(reader.pages)}")
-            
-            text = ""
-            for i, page in enumerate(reader.pages, 1):
-                logger.info(f"Extracting text from page {i}/{len(reader.pages)}")
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-                else:
+            if extracted.error:
+                raise ValueError(extracted.error)
+            logger.info(f"PDF file loaded, number of pages: {len(extracted.pages)}")
+
+            for i, page_text in enumerate(extracted.pages, 1):
+                if not page_text:
                     logger.warning(f"No text extracted from page {i}")
-            
+
+            text = extracted.text
             if not text.strip():
                 logger.warning(f"No text extracted from PDF file: {file_path}")
                 return None
             
-            metadata = reader.metadata
-            title = metadata.get('/Title', os.path.basename(file_path))
+            title = extracted.title or os.path.basename(file_path)
             
             logger.info(f"Successfully processed PDF file: {file_path}")
             logger.info(f"Extracted text length: {len(text)} characters")
@@ -113,7 +125,7 @@ class FileLoader:
                     'source': file_path,
                     'title': title,
                     'type': 'pdf',
-                    'pages': len(reader.pages)
+                    'pages': len(extracted.pages)
                 }
             )
             
@@ -121,10 +133,10 @@ class FileLoader:
             logger.error(f"Error loading PDF file {file_path}: {str(e)}", exc_info=True)
             return None
 
-    def generate_embeddings(self, documents: List[Document]) -> List[Document]:
+    def generate_embeddings(self, documents: List[Document], embedding_service=None) -> List[Document]:
         from ..core.embeddings import EmbeddingService
-        embedding_service = EmbeddingService()
-        for doc in documents:
-            embedding = embedding_service.generate_single(doc.text)
+        embedding_service = embedding_service or EmbeddingService()
+        embeddings = embedding_service.encode_batch([doc.text for doc in documents])
+        for doc, embedding in zip(documents, embeddings):
             doc.set_embedding(embedding)
         return documents
\ No newline at end of file
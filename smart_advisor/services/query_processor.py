@@ -9,6 +9,9 @@ from nltk.stem import SnowballStemmer
 
 from ..models import SearchResult, Query, Response
 from ..config.config import config
+from ..core.reranker import Reranker
+from ..core.lexical_index import reciprocal_rank_fusion
+from ..core.tagging import scholarship_filter
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +20,7 @@ class QueryProcessor:
     def __init__(self, vector_db):
         self.vector_db = vector_db
         self._cache: Dict[str, Response] = {}
+        self.reranker = Reranker() if config.RERANK_CONFIG['enabled'] else None
         
         try:
             nltk.data.find('tokenizers/punkt')
@@ -91,44 +95,132 @@ class QueryProcessor:
             query.text = self._preprocess_text(query.text)
             
             if not query.text:
-                return Response(
-                    query=query,
-                    answer="Пожалуйста, введите ваш вопрос.",
-                    sources=[],
-                    confidence=0.0
-                )
+                return self._empty_query_response(query)
                 
-            search_results = self.vector_db.search(query.text, k=10)
+            search_results = self._search(query.text)
             
-            if not search_results:
-                return Response(
-                    query=query,
-                    answer="К сожалению, я не нашел информации по вашему запросу.",
-                    sources=[],
-                    confidence=0.0
-                )
-            
-            answer, confidence = self._extract_answer_with_context(query.text, search_results)
-            
-            response = Response(
-                query=query,
-                answer=answer if answer else "К сожалению, я не смог найти точный ответ на ваш вопрос в доступных документах.",
-                sources=search_results[:3],
-                confidence=confidence
-            )
-            
-            self._cache[query.text] = response
-            return response
+            return self._build_response(query, search_results)
             
         except Exception as e:
             logger.error(f"Ошибка при обработке запроса: {str(e)}")
+            return self._error_response(query_text)
+
+    def process_queries(self, query_texts: List[str]) -> List[Union[Response, str]]:
+        # Пакетная версия process_query: все незакэшированные запросы ищутся одним вызовом search_many
+        responses: List[Optional[Response]] = [None] * len(query_texts)
+        pending = []
+
+        for i, query_text in enumerate(query_texts):
+            if query_text in self._cache:
+                responses[i] = self._cache[query_text]
+                continue
+            query = Query(text=self._preprocess_text(query_text))
+            if not query.text:
+                responses[i] = self._empty_query_response(query)
+            else:
+                pending.append((i, query))
+
+        if pending:
+            try:
+                all_results = self._search_many([query.text for _, query in pending])
+            except Exception as e:
+                logger.error(f"Ошибка при пакетном поиске: {str(e)}")
+                for i, _ in pending:
+                    responses[i] = self._error_response(query_texts[i])
+                return responses
+
+            for (i, query), search_results in zip(pending, all_results):
+                try:
+                    responses[i] = self._build_response(query, search_results)
+                except Exception as e:
+                    logger.error(f"Ошибка при обработке запроса: {str(e)}")
+                    responses[i] = self._error_response(query_texts[i])
+
+        return responses
+
+    def _search(self, text: str) -> List[SearchResult]:
+        # Если в вопросе назван тип стипендии, фрагменты с этим тегом поднимаются в выдаче:
+        # поиск с фильтром объединяется с обычным, так что неразмеченные фрагменты не теряются
+        search_results = self.vector_db.search(text, k=10)
+        where = scholarship_filter(self._detect_advisor_type(text))
+        if where:
+            return self._fuse(self.vector_db.search(text, k=10, where=where), search_results)
+        return search_results
+
+    @staticmethod
+    def _fuse(filtered: List[SearchResult], unfiltered: List[SearchResult], k: int = 10) -> List[SearchResult]:
+        # RRF двух списков: фрагмент из обоих получает вклад дважды и оказывается выше
+        by_id = {result.document_id: result for result in unfiltered}
+        by_id.update({result.document_id: result for result in filtered})
+        ranking = reciprocal_rank_fusion([[result.document_id for result in filtered],
+                                          [result.document_id for result in unfiltered]])
+        return [by_id[document_id] for document_id in ranking[:k]]
+
+    def _search_many(self, texts: List[str]) -> List[List[SearchResult]]:
+        # Все запросы ищутся одним вызовом search_many, запросы с фильтром - ещё одним на группу
+        groups: Dict[str, List[int]] = {}
+        filters: Dict[str, Optional[Dict[str, Any]]] = {}
+        for i, text in enumerate(texts):
+            where = scholarship_filter(self._detect_advisor_type(text))
+            key = str(where)
+            groups.setdefault(key, []).append(i)
+            filters[key] = where
+
+        all_results = self.vector_db.search_many(texts, k=10)
+        for key, indices in groups.items():
+            if filters[key] is None:
+                continue
+            for i, results in zip(indices, self.vector_db.search_many([texts[i] for i in indices], k=10,
+                                                                      where=filters[key])):
+                all_results[i] = self._fuse(results, all_results[i])
+        return all_results
+
+    def _build_response(self, query: Query, search_results: List[SearchResult]) -> Response:
+        if not search_results:
             return Response(
-                query=Query(text=query_text),
-                answer="Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте переформулировать вопрос.",
+                query=query,
+                answer="К сожалению, я не нашел информации по вашему запросу.",
                 sources=[],
                 confidence=0.0
             )
 
+        if self.reranker is not None:
+            try:
+                search_results = self.reranker.rerank(query.text, search_results)
+            except Exception as e:
+                logger.error(f"Ошибка при переранжировании, используется порядок поиска: {str(e)}")
+        
+        answer, confidence = self._extract_answer_with_context(query.text, search_results)
+        
+        response = Response(
+            query=query,
+            answer=answer if answer else "К сожалению, я не смог найти точный ответ на ваш вопрос в доступных документах.",
+            sources=search_results[:3],
+            confidence=confidence
+        )
+        
+        self._cache[query.text] = response
+        return response
+
+    def rerank_stats(self) -> Dict[str, Any]:
+        return self.reranker.stats() if self.reranker is not None else {}
+
+    def _empty_query_response(self, query: Query) -> Response:
+        return Response(
+            query=query,
+            answer="Пожалуйста, введите ваш вопрос.",
+            sources=[],
+            confidence=0.0
+        )
+
+    def _error_response(self, query_text: str) -> Response:
+        return Response(
+            query=Query(text=query_text),
+            answer="Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте переформулировать вопрос.",
+            sources=[],
+            confidence=0.0
+        )
+
     def _preprocess_text(self, text: str) -> str:
 
         text = text.lower().strip()
@@ -0,0 +1,242 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+from ..core.chunking import chunk_document
+from .file_loader import FileLoader
+
+logger = logging.getLogger(__name__)
+
+
+class DirectoryWatcher:
+    # Живая инкрементальная индексация HTML_DIR и PDF_DIR: события файловой системы копятся по путям,
+    # файл переиндексируется, когда события по нему затихли на debounce_seconds (копирование большого PDF
+    # даёт серию изменений). Переиндексируются только добавленные, изменённые и удалённые файлы:
+    # фрагменты файла сверяются с индексом, эмбеддинги считаются только для новых.
+    # Задержка свежести - от изменения файла (mtime, для удалённых - момент события) до публикации нового
+    # поколения версии (generations/<версия>.json): с этого момента процесс бота переоткрывает индекс при ближайшем refresh()
+    # (не позже чем через alias_check_interval).
+
+    def __init__(self, vector_db, embedding_service, file_loader: Optional[FileLoader] = None,
+                 debounce_seconds: Optional[float] = None, poll_interval: Optional[float] = None,
+                 use_polling: Optional[bool] = None):
+        self.vector_db = vector_db
+        self.embedding_service = embedding_service
+        self.file_loader = file_loader or FileLoader()
+        self.directories = {str(self.file_loader.html_dir): '.html', str(self.file_loader.pdf_dir): '.pdf'}
+        self.debounce = settings.WATCHER_CONFIG['debounce_seconds'] if debounce_seconds is None else debounce_seconds
+        self.poll_interval = poll_interval or settings.WATCHER_CONFIG['poll_interval']
+        self.use_polling = settings.WATCHER_CONFIG['use_polling'] if use_polling is None else use_polling
+
+        self._condition = threading.Condition()
+        self._changed: Dict[str, Tuple[float, float]] = {}  # путь -> (последнее событие monotonic, первое событие time)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._observer = None
+
+        self._lock = threading.Lock()
+        self.files_indexed = 0
+        self.files_deleted = 0
+        self.errors = 0
+        self.lags = deque(maxlen=1000)
+
+    def _normalize(self, path: str) -> Optional[str]:
+        # Путь в том виде, в котором его пишет FileLoader в metadata['source']; файлы вне
+        # отслеживаемых директорий и с чужими расширениями игнорируются
+        directory = os.path.dirname(os.path.abspath(path))
+        for watched, extension in self.directories.items():
+            if os.path.abspath(watched) == directory and path.endswith(extension):
+                return os.path.join(watched, os.path.basename(path))
+        return None
+
+    def notify(self, path: str) -> None:
+        source = self._normalize(path)
+        if source is None:
+            return
+        with self._condition:
+            first_seen = self._changed.get(source, (0.0, time.time()))[1]
+            self._changed[source] = (time.monotonic(), first_seen)
+            self._condition.notify()
+
+    def start(self) -> None:
+        for directory in self.directories:
+            os.makedirs(directory, exist_ok=True)
+        if not self.use_polling and self._start_observer():
+            logger.info(f"Слежение за {', '.join(self.directories)} через watchdog")
+        else:
+            self._spawn(self._poll_loop, "watcher-poll")
+            logger.info(f"Слежение за {', '.join(self.directories)} опросом раз в {self.poll_interval}с")
+        self._spawn(self._index_loop, "watcher-index")
+
+    def _spawn(self, target, name: str) -> None:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _start_observer(self) -> bool:
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            logger.warning("watchdog не установлен, используется опрос директорий")
+            return False
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # opened/closed без записи приходят и от чтения файла самим загрузчиком
+                if event.is_directory or event.event_type not in ('created', 'modified', 'deleted', 'moved'):
+                    return
+                watcher.notify(event.src_path)
+                # Переименование: старый путь удалён, новый появился
+                if getattr(event, 'dest_path', None):
+                    watcher.notify(event.dest_path)
+
+        try:
+            observer = Observer()
+            for directory in self.directories:
+                observer.schedule(Handler(), directory, recursive=False)
+            observer.start()
+        except OSError as e:
+            logger.warning(f"Не удалось запустить watchdog ({str(e)}), используется опрос директорий")
+            return False
+        self._observer = observer
+        return True
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        for directory, extension in self.directories.items():
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.name.endswith(extension):
+                        stat = entry.stat()
+                        state[os.path.join(directory, entry.name)] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    continue
+        return state
+
+    def _poll_loop(self) -> None:
+        previous = self._scan()
+        while not self._stop.wait(self.poll_interval):
+            current = self._scan()
+            for path in set(previous) | set(current):
+                if previous.get(path) != current.get(path):
+                    self.notify(path)
+            previous = current
+
+    def _index_loop(self) -> None:
+        while not self._stop.is_set():
+            with self._condition:
+                now = time.monotonic()
+                due = {path: first_seen for path, (last_event, first_seen) in self._changed.items()
+                       if now - last_event >= self.debounce}
+                if not due:
+                    # Ждём, пока затихнет самый ранний из изменённых файлов, или нового события
+                    timeout = min((last_event + self.debounce - now for last_event, _ in self._changed.values()),
+                                  default=None)
+                    self._condition.wait(timeout)
+                    continue
+                for path in due:
+                    del self._changed[path]
+            try:
+                self.reindex(due)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                logger.error(f"Ошибка при переиндексации {', '.join(due)}: {str(e)}")
+
+    def reindex(self, changes: Dict[str, float]) -> None:
+        # changes - путь -> время первого события; лексический индекс обновляется один раз на пачку файлов.
+        # Псевдоним перечитывается перед каждой пачкой: если другой процесс переключил версию,
+        # запись идёт в новую активную, а не в старую, которую затем удалит очистка версий
+        self.vector_db.refresh(force=True)
+        lags = []
+        for path, first_seen in changes.items():
+            # Отсчёт от последней записи в файл; mtime, сохранённый при копировании, и удаление - от первого события
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                mtime = 0.0
+            changed_at = mtime if mtime >= first_seen - self.poll_interval else first_seen
+            if self._reindex_file(path):
+                lags.append(changed_at)
+        if not lags:
+            return
+
+        # Без изменений в индексе (файл пересохранён с тем же текстом) поколение не публикуется
+        finished = self.vector_db.update_lexical() or time.time()
+        with self._lock:
+            self.lags.extend(finished - changed_at for changed_at in lags)
+        logger.info(f"Переиндексировано файлов: {len(changes)}, задержка свежести "
+                    f"{max(finished - changed_at for changed_at in lags):.1f}с")
+
+    def _reindex_file(self, path: str) -> bool:
+        indexed = self.vector_db.indexed_metadata(where={'source': path})
+        deleted = not os.path.exists(path)
+        chunks = []
+        if not deleted:
+            document = self.file_loader.load_html(path) if path.endswith('.html') else self.file_loader.load_pdf(path)
+            chunks = chunk_document(document) if document is not None else None
+            if chunks is None:
+                # Файл мог быть ещё не докопирован или не разобраться: прежние фрагменты остаются
+                # до следующего изменения, а не удаляются как исчезнувшие.
+                # Пустой список - в файле больше нет текста, его фрагменты удаляются ниже
+                with self._lock:
+                    self.errors += 1
+                logger.warning(f"{path}: не удалось загрузить или разбить на фрагменты, индекс по файлу не изменён")
+                return False
+
+        pending = [chunk for chunk in chunks if indexed.get(chunk.id) != chunk.metadata]
+        stale_ids = sorted(set(indexed) - {chunk.id for chunk in chunks})
+
+        if pending:
+            embeddings = self.embedding_service.encode_batch([chunk.text for chunk in pending])
+            for chunk, embedding in zip(pending, embeddings):
+                chunk.set_embedding(embedding)
+            self.vector_db.upsert_documents(pending, update_lexical=False)
+        self.vector_db.delete_documents(stale_ids, update_lexical=False)
+
+        with self._lock:
+            if deleted:
+                self.files_deleted += 1
+            else:
+                self.files_indexed += 1
+        logger.info(f"{path}: новых фрагментов {len(pending)}, удалено {len(stale_ids)}, "
+                    f"без изменений {len(chunks) - len(pending)}")
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lags = list(self.lags)
+            return {
+                'files_indexed': self.files_indexed,
+                'files_deleted': self.files_deleted,
+                'errors': self.errors,
+                'pending': len(self._changed),
+                'freshness_lag_p50_s': float(np.percentile(lags, 50)) if lags else 0.0,
+                'freshness_lag_p99_s': float(np.percentile(lags, 99)) if lags else 0.0,
+                'freshness_lag_max_s': max(lags) if lags else 0.0
+            }
@@ -0,0 +1,70 @@
+import pytest
+
+from smart_advisor.config.config import config
+from smart_advisor.core.chunking import split_into_chunks, split_into_sentences
+
+
+class WhitespaceTokenizer:
+    # Один токен на слово - длины фрагментов проверяются в словах
+
+    def __call__(self, texts, add_special_tokens=False, truncation=False):
+        return {'input_ids': [text.split() for text in texts]}
+
+
+@pytest.fixture
+def tokenizer(monkeypatch):
+    monkeypatch.setitem(config.CHUNK_CONFIG, 'max_tokens', 20)
+    return WhitespaceTokenizer()
+
+
+def sentence(word: str, length: int) -> str:
+    return ' '.join([word.capitalize()] + [word] * (length - 1)) + '.'
+
+
+def test_sentences_split_at_paragraphs_but_not_at_line_breaks():
+    text = "Первое предложение.\nПродолжение строки.\n\nНовый абзац"
+    assert split_into_sentences(text) == ["Первое предложение.", "Продолжение строки.", "Новый абзац"]
+
+
+def test_abbreviations_do_not_end_sentence():
+    text = "Согласно п. 3 ст. 36 т.е. Положение. Ч. 2 ст. 5 Закона. См. Приложение 1."
+    assert split_into_sentences(text) == ["Согласно п. 3 ст. 36 т.е. Положение.", "Ч. 2 ст. 5 Закона.",
+                                          "См. Приложение 1."]
+
+
+def test_single_letter_abbreviation_before_capital_ends_sentence():
+    assert split_into_sentences("Назначена в 2023 г. Стипендия выплачивается.") == \
+        ["Назначена в 2023 г.", "Стипендия выплачивается."]
+
+
+def test_chunks_overlap_by_whole_sentences(tokenizer):
+    text = ' '.join(sentence(word, 4) for word in ('альфа', 'бета', 'гамма', 'дельта'))
+    chunks = split_into_chunks(text, tokenizer, target_tokens=8, overlap_tokens=4, min_tokens=2)
+    assert chunks == [
+        "альфа альфа альфа альфа. бета бета бета бета.",
+        "бета бета бета бета. гамма гамма гамма гамма.",
+        "гамма гамма гамма гамма. дельта дельта дельта дельта.",
+    ]
+
+
+def test_undersized_chunk_is_not_emitted_mid_stream(tokenizer):
+    # После перекрытия во втором фрагменте только 2 новых токена: он дорастает сверх target до max
+    text = ' '.join([sentence('а', 7), sentence('б', 2), sentence('в', 2), sentence('г', 7)])
+    chunks = split_into_chunks(text, tokenizer, target_tokens=10, overlap_tokens=3, min_tokens=3)
+    assert [len(chunk.split()) for chunk in chunks] == [9, 11]
+    assert chunks[1] == "б б. в в. г г г г г г г."
+
+
+def test_short_tail_is_merged_into_previous_chunk(tokenizer):
+    text = ' '.join([sentence('а', 6), sentence('б', 6), sentence('в', 1)])
+    chunks = split_into_chunks(text, tokenizer, target_tokens=8, overlap_tokens=0, min_tokens=3)
+    assert chunks == ["а а а а а а.", "б б б б б б. в."]
+
+
+def test_long_sentence_is_split_by_words(tokenizer):
+    chunks = split_into_chunks(sentence('слово', 25), tokenizer, target_tokens=10, overlap_tokens=0, min_tokens=0)
+    assert [len(chunk.split()) for chunk in chunks] == [10, 10, 5]
+
+
+def test_empty_text_has_no_chunks(tokenizer):
+    assert split_into_chunks("  \n\n ", tokenizer) == []
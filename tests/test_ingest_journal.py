@@ -0,0 +1,58 @@
+import pytest
+
+from smart_advisor.core.ingest_journal import IngestJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = IngestJournal(str(tmp_path / "ingest_journal.jsonl"))
+    yield journal
+    journal.close()
+
+
+def test_no_journal_means_no_unfinished_run(journal):
+    assert journal.unfinished_run() is None
+
+
+def test_unfinished_run_collects_done_files_and_written_chunks(journal):
+    journal.start('run-1', 'documents_v1', full_rebuild=True)
+    journal.parsed('a.pdf', 2, 2)
+    journal.written(['a-0', 'a-1'])
+    journal.file_done('a.pdf', (10, 1000), ['a-0', 'a-1'])
+    journal.parsed('b.pdf', 3, 3)
+    journal.written(['b-0'])
+
+    run = journal.unfinished_run()
+    assert run['run_id'] == 'run-1'
+    assert run['version'] == 'documents_v1'
+    assert run['full_rebuild'] is True
+    assert run['written'] == 3
+    assert run['files'] == {'a.pdf': {'fingerprint': (10, 1000), 'chunk_ids': ['a-0', 'a-1']}}
+
+
+def test_completed_run_is_not_resumed(journal):
+    journal.start('run-1', None, full_rebuild=False)
+    journal.complete(None)
+    assert journal.unfinished_run() is None
+
+
+def test_torn_last_line_is_ignored(journal):
+    journal.start('run-1', 'documents_v1', full_rebuild=True)
+    journal.file_done('a.pdf', (10, 1000), ['a-0'])
+    journal.close()
+    # Сбой посреди записи события: строка оборвана и не завершена переводом строки
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"event": "file_done", "path": "b.pd')
+
+    run = journal.unfinished_run()
+    assert list(run['files']) == ['a.pdf']
+
+
+def test_new_run_replaces_previous_events(journal):
+    journal.start('run-1', 'documents_v1', full_rebuild=True)
+    journal.file_done('a.pdf', (10, 1000), ['a-0'])
+    journal.start('run-2', None, full_rebuild=False)
+
+    run = journal.unfinished_run()
+    assert run['run_id'] == 'run-2'
+    assert run['files'] == {}